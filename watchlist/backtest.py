@@ -0,0 +1,97 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_fetcher import DataFetcher
+from indicator_engine import Panel
+from ohlcv_cache import OHLCVCache
+from signals import evaluate_history, signal_names
+from watchlist_parser import WatchlistParser
+
+FORWARD_HORIZONS = (1, 5, 10, 20)
+BATCH_SIZE = 50
+
+
+def scan_frames(frames, names, horizons=FORWARD_HORIZONS):
+    # Every (ticker, date, signal) on which a signal fired over the frames' history,
+    # with the close-to-close return `h` bars later for each horizon
+    panel = Panel.from_frames(frames)
+    if not panel.tickers:
+        return pd.DataFrame()
+    fired, lookback = evaluate_history(panel, names)
+    close = panel['Close']
+    bars = len(panel)
+
+    events = []
+    for name, hits in fired.items():
+        rows, cols = np.nonzero(hits)
+        rows = rows + lookback
+        event = {
+            'Ticker': np.asarray(panel.tickers)[cols],
+            'Date': panel.dates[rows, cols],
+            'Signal': name,
+            'Close': close[rows, cols],
+        }
+        for horizon in horizons:
+            ahead = np.minimum(rows + horizon, bars - 1)
+            returns = close[ahead, cols] / close[rows, cols] - 1
+            event[f'Return_{horizon}d'] = np.where(rows + horizon < bars, returns, np.nan)
+        events.append(pd.DataFrame(event))
+    return pd.concat(events, ignore_index=True) if events else pd.DataFrame()
+
+
+def scan_history(tickers, period='10y', start=None, end=None, signals=None, horizons=FORWARD_HORIZONS,
+                 workers=None, batch_size=BATCH_SIZE, fetcher=None):
+    # Historical scan over the whole universe, parallelized across ticker batches
+    names = signals or signal_names('1d')
+    fetcher = fetcher or DataFetcher()
+    frames = fetcher.download(tickers, period=None if start else period, start=start, end=end, interval='1d')
+
+    batches = [
+        {ticker: frames[ticker] for ticker in tickers[i:i + batch_size] if ticker in frames}
+        for i in range(0, len(tickers), batch_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(scan_frames, batches, [names] * len(batches), [horizons] * len(batches)))
+
+    results = [result for result in results if not result.empty]
+    if not results:
+        return pd.DataFrame(columns=['Ticker', 'Date', 'Signal', 'Close'] + [f'Return_{h}d' for h in horizons])
+    return pd.concat(results, ignore_index=True).sort_values(['Date', 'Ticker', 'Signal'], ignore_index=True)
+
+
+def summarize(events, horizons=FORWARD_HORIZONS):
+    # Per signal: event count, share of events with a positive forward return, and mean forward return
+    if events.empty:
+        return pd.DataFrame()
+    grouped = events.groupby('Signal')
+    summary = pd.DataFrame({'Events': grouped.size()})
+    for horizon in horizons:
+        column = f'Return_{horizon}d'
+        summary[f'HitRate_{horizon}d'] = grouped[column].apply(lambda r: (r.dropna() > 0).mean())
+        summary[f'MeanReturn_{horizon}d'] = grouped[column].mean()
+    return summary.sort_values('Events', ascending=False)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Scan watchlist history for every registered signal')
+    arg_parser.add_argument('watchlist', help='Watchlist file to scan')
+    arg_parser.add_argument('--period', default='10y')
+    arg_parser.add_argument('--signals', nargs='*', help='Signal names, defaults to all daily signals')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--output', default='signal_events.csv')
+    args = arg_parser.parse_args()
+
+    parser = WatchlistParser(args.watchlist)
+    tickers = parser.extract_tickers(parser.read_watchlist())
+    events = scan_history(tickers, period=args.period, signals=args.signals, workers=args.workers,
+                          fetcher=DataFetcher(cache=OHLCVCache()))
+    events.to_csv(args.output, index=False)
+    print(f"{len(events)} signal events written to {args.output}")
+    print(summarize(events).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from analyzer import StockAnalyzer
+from data_fetcher import DataFetcher
+from ohlcv_cache import COLUMNS, OHLCVCache, period_start
+from reports import pack_messages, render_daily_report, render_longterm_report
+from test2 import check_watchlist
+from watchlist_parser import WatchlistParser
+
+SIZES = (10, 500, 5000)
+HISTORY_BARS = 1300  # ~5 years of sessions, enough for the long-term quarterly signals
+STAGES = ('parse', 'daily', 'daily_report', 'longterm', 'longterm_report', 'backtest')
+BASELINE_FILE = 'benchmark_baseline.json'
+TOLERANCE = 0.25  # Allowed slowdown over the baseline before a stage counts as a regression
+MIN_REGRESSION = 0.005  # Seconds; slowdowns smaller than this are timer noise
+
+
+class SyntheticProvider:
+    # Local stand-in for yf.download. Every ticker gets its own seeded random walk
+    # ending today, so a run is reproducible and needs no network. latency adds
+    # a sleep per request to mimic a round trip.
+    def __init__(self, bars=HISTORY_BARS, latency=0.0):
+        self.bars = bars
+        self.latency = latency
+        self.request_times = []
+        # Built once: generating a business-day range is far slower than the bars themselves
+        self.dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=bars, name='Date')
+
+    def history(self, ticker):
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        close = 20 + 180 * rng.random() * np.exp(np.cumsum(rng.normal(0, 0.02, self.bars)))
+        spread = np.abs(rng.normal(0, 0.01, (2, self.bars)))
+        open_ = close * (1 + rng.normal(0, 0.005, self.bars))
+        high = np.maximum(open_, close) * (1 + spread[0])
+        low = np.minimum(open_, close) * (1 - spread[1])
+        volume = rng.integers(100_000, 10_000_000, self.bars).astype(float)
+        return pd.DataFrame(dict(zip(COLUMNS, (open_, high, low, close, close, volume))), index=self.dates)
+
+    def __call__(self, tickers, group_by='ticker', progress=False, period=None, start=None, end=None, interval='1d'):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        start = pd.Timestamp(start) if start is not None else period_start(period)
+        frames = {}
+        for ticker in tickers:
+            frame = self.history(ticker)
+            frame = frame[frame.index >= start]
+            if end is not None:
+                frame = frame[frame.index < pd.Timestamp(end)]
+            frames[ticker] = frame
+        self.request_times.append(time.perf_counter() - started)
+        return pd.concat(frames, axis=1)
+
+
+class RecordedProvider(SyntheticProvider):
+    # Serves bars recorded in an OHLCV cache database. Benchmark tickers are
+    # mapped round-robin onto the recorded ones, so any universe size works.
+    def __init__(self, db_path, latency=0.0):
+        super().__init__(latency=latency)
+        self.cache = OHLCVCache(db_path)
+        self.recorded = sorted(self.cache.tickers())
+        if not self.recorded:
+            raise ValueError(f"No recorded tickers in {db_path}")
+
+    def history(self, ticker):
+        source = self.recorded[zlib.crc32(ticker.encode()) % len(self.recorded)]
+        return self.cache.load(source, '1d')
+
+
+def synthetic_tickers(count):
+    return [f"SYN{i:05d}" for i in range(count)]
+
+
+def write_watchlist(path, tickers, section_size=50):
+    # Same layout as the exported watchlists: ###section markers between EXCHANGE:TICKER entries
+    tokens = []
+    for i, ticker in enumerate(tickers):
+        if i % section_size == 0:
+            tokens.append(f"###Section{i // section_size}")
+        tokens.append(f"NASDAQ:{ticker}")
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(','.join(tokens))
+
+
+def run_stage(stage, analyzer, fetcher, results):
+    # Run one stage and return the signal results later report stages render
+    if stage == 'daily':
+        return analyzer.analyze()
+    if stage == 'daily_report':
+        pack_messages(render_daily_report(results))
+    elif stage == 'longterm':
+        return analyzer.analyze_longterm()
+    elif stage == 'longterm_report':
+        pack_messages(render_longterm_report(results, 'benchmark'))
+    elif stage == 'backtest':
+        end_date = datetime.now().date()
+        check_watchlist(analyzer.tickers, end_date - timedelta(days=2 * 365), end_date, fetcher)
+    return results
+
+
+def run_pipeline(watchlist_file, provider, stages=STAGES):
+    # Parse -> fetch -> indicators -> signals -> report, timing each stage in seconds.
+    # A report stage renders whatever the analysis stage before it produced.
+    timings = {}
+    fetcher = DataFetcher(downloader=provider)
+
+    started = time.perf_counter()
+    parser = WatchlistParser(watchlist_file)
+    tickers = parser.extract_tickers(parser.read_watchlist())
+    timings['parse'] = time.perf_counter() - started
+
+    analyzer = StockAnalyzer(tickers, fetcher)
+    results = {}
+    for stage in stages:
+        if stage == 'parse':
+            continue
+        started = time.perf_counter()
+        # Per-ticker freshness lines would swamp the benchmark output
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = run_stage(stage, analyzer, fetcher, results)
+        timings[stage] = time.perf_counter() - started
+    return timings
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float('nan')
+
+
+def benchmark_size(size, repeat, provider_factory, stages, workdir, measure_memory=True):
+    watchlist_file = os.path.join(workdir, f'watchlist_{size}.txt')
+    write_watchlist(watchlist_file, synthetic_tickers(size))
+
+    runs = []
+    request_times = []
+    for _ in range(repeat):
+        provider = provider_factory()
+        runs.append(run_pipeline(watchlist_file, provider, stages))
+        request_times.extend(provider.request_times)
+
+    peak = float('nan')
+    if measure_memory:
+        # A separate traced run: tracemalloc slows Python code down too much to time under it.
+        # Backtest worker processes are not traced, only this process's allocations.
+        tracemalloc.start()
+        run_pipeline(watchlist_file, provider_factory(), stages)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result = {'tickers': size, 'stages': {}, 'peak_mb': peak / 2 ** 20}
+    for stage in runs[0]:
+        times = [run[stage] for run in runs]
+        median = statistics.median(times)
+        result['stages'][stage] = {
+            'p50': median,
+            'p95': percentile(times, 95),
+            'max': max(times),
+            'tickers_per_s': size / median if median > 0 else float('inf'),
+        }
+    result['total_p50'] = sum(stage['p50'] for stage in result['stages'].values())
+    result['request_latency'] = {f'p{q}': percentile(request_times, q) for q in (50, 95, 99)}
+    return result
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # Stages whose median got slower than baseline * (1 + tolerance), as readable lines
+    regressions = []
+    for size, result in results.items():
+        reference = baseline.get(size)
+        if reference is None:
+            continue
+        for stage, timing in result['stages'].items():
+            before = reference['stages'].get(stage, {}).get('p50')
+            if before and timing['p50'] > before * (1 + tolerance) and timing['p50'] - before > MIN_REGRESSION:
+                regressions.append(f"{size} tickers / {stage}: {timing['p50']:.3f}s vs baseline {before:.3f}s")
+        if result['peak_mb'] > reference['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{size} tickers / peak memory: {result['peak_mb']:.1f}MB vs baseline {reference['peak_mb']:.1f}MB")
+    return regressions
+
+
+def print_result(result):
+    print(f"\n{result['tickers']} tickers: total p50 {result['total_p50']:.3f}s, peak {result['peak_mb']:.1f}MB")
+    print(f"  {'stage':<16}{'p50 s':>10}{'p95 s':>10}{'max s':>10}{'tickers/s':>12}")
+    for stage, timing in result['stages'].items():
+        print(f"  {stage:<16}{timing['p50']:>10.3f}{timing['p95']:>10.3f}{timing['max']:>10.3f}{timing['tickers_per_s']:>12.0f}")
+    latency = result['request_latency']
+    print(f"  data requests: p50 {latency['p50'] * 1000:.1f}ms, p95 {latency['p95'] * 1000:.1f}ms, p99 {latency['p99'] * 1000:.1f}ms")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark the watchlist pipeline against local market data')
+    arg_parser.add_argument('--sizes', type=int, nargs='*', default=list(SIZES), help='Universe sizes to run')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Timed runs per size')
+    arg_parser.add_argument('--stages', nargs='*', default=list(STAGES), choices=STAGES)
+    arg_parser.add_argument('--skip-memory', action='store_true', help='Skip the slower tracemalloc pass')
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='Simulated seconds per data request')
+    arg_parser.add_argument('--recorded', help='Serve bars recorded in this OHLCV cache database instead of synthetic ones')
+    arg_parser.add_argument('--baseline', default=BASELINE_FILE)
+    arg_parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    arg_parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = arg_parser.parse_args()
+
+    if args.recorded:
+        provider_factory = lambda: RecordedProvider(args.recorded, latency=args.latency)
+    else:
+        provider_factory = lambda: SyntheticProvider(latency=args.latency)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results[str(size)] = benchmark_size(size, args.repeat, provider_factory, args.stages, workdir,
+                                               measure_memory=not args.skip_memory)
+            print_result(results[str(size)])
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            raise SystemExit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
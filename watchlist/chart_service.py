@@ -0,0 +1,104 @@
+import io
+import threading
+import time
+
+import matplotlib.dates as mdates
+import matplotlib.style
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from data_fetcher import DataFetcher
+
+BENCHMARK = 'QQQ'
+STYLE = 'dark_background'
+REFRESH_SECONDS = 15 * 60  # How long the in-memory close series is used before asking for newer bars
+
+# Lidao column -> (color, marker) for the secondary axis
+LIDAO_LINES = {
+    'Lidao-1.0': ('magenta', 's'),
+    'Lidao-SPX': ('lime', '^'),
+    'Lidao-NASDAQ': ('yellow', 'D'),
+}
+
+
+class ChartService:
+    # Renders the QQQ vs Lidao chart to PNG bytes without pyplot or the disk.
+    # The figure, axes and lines are built once and only their data changes
+    # between renders; the QQQ closes stay in memory and only bars after the
+    # last one held are fetched.
+    def __init__(self, lidao_store, fetcher=None, ticker=BENCHMARK):
+        self.lidao_store = lidao_store
+        self.fetcher = fetcher or DataFetcher()
+        self.ticker = ticker
+        self.close = pd.Series(dtype=float)
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+        self.figure = None
+
+    def benchmark_close(self, start):
+        # Close series from start onwards, topping up the cached series with missing days only
+        start = pd.Timestamp(start)
+        # Renders run in executor threads, so the series is read and replaced under the lock
+        with self.lock:
+            if self.close.empty or start < self.close.index[0]:
+                self.close = self.download(start)
+            elif time.time() - self.fetched_at > REFRESH_SECONDS:
+                newer = self.download(self.close.index[-1])
+                if not newer.empty:
+                    # The last cached bar may have been provisional, take the refetched one
+                    self.close = pd.concat([self.close[self.close.index < newer.index[0]], newer])
+            self.fetched_at = time.time()
+            return self.close[self.close.index >= start]
+
+    def download(self, start):
+        frame = self.fetcher.download([self.ticker], start=start.strftime('%Y-%m-%d')).get(self.ticker)
+        if frame is None or frame.empty:
+            return pd.Series(dtype=float)
+        return frame['Close'].astype(float)
+
+    def combined_data(self):
+        lidao_data = self.lidao_store.load()
+        if lidao_data.empty:
+            raise ValueError("No Lidao readings recorded yet")
+        combined_data = self.benchmark_close(lidao_data.index.min()).rename(f'{self.ticker} Close').to_frame()
+        return combined_data.join(lidao_data, how='inner')  # Inner join to ensure all data are aligned
+
+    def build_figure(self):
+        figure = Figure(figsize=(10, 6))
+        FigureCanvasAgg(figure)
+        ax1 = figure.add_subplot()
+        ax1.set_xlabel('Date')
+        ax1.set_ylabel(f'{self.ticker} Close', color='cyan')
+        ax1.tick_params(axis='y', labelcolor='cyan')
+        ax1.xaxis_date()
+        ax2 = ax1.twinx()
+        ax2.set_ylabel('Lidao Indices', color='magenta')
+        ax2.tick_params(axis='y', labelcolor='magenta')
+
+        lines = {f'{self.ticker} Close': ax1.plot([], [], label=f'{self.ticker} Close', color='cyan', marker='*',
+                                                  linestyle='-', markersize=8)[0]}
+        for column, (color, marker) in LIDAO_LINES.items():
+            lines[column] = ax2.plot([], [], label=column, color=color, marker=marker, linestyle='-', markersize=6)[0]
+
+        figure.tight_layout(rect=[0, 0, 1, 0.95])
+        figure.legend(loc='upper left', bbox_to_anchor=(0.1, 0.9))
+        ax2.set_title(f'{self.ticker} Close and Lidao Indices on Dark Background', fontsize=16, color='white')
+        self.figure = (figure, (ax1, ax2), lines)
+
+    def render(self):
+        # PNG bytes of the current chart; blocking, so run it in an executor from async code
+        combined_data = self.combined_data()
+        dates = mdates.date2num(combined_data.index.to_pydatetime())
+        with self.lock, matplotlib.style.context(STYLE):
+            if self.figure is None:
+                self.build_figure()
+            figure, axes, lines = self.figure
+            for column, line in lines.items():
+                line.set_data(dates, combined_data[column].to_numpy())
+            for ax in axes:
+                ax.relim()
+                ax.autoscale_view()
+            buffer = io.BytesIO()
+            figure.savefig(buffer, format='png')
+        return buffer.getvalue()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Standard library only: the client has to start fast, the daemon holds pandas and the data
+SOCKET_PATH = os.environ.get('WATCHLIST_SOCKET', os.path.join(tempfile.gettempdir(), 'watchlist_daemon.sock'))
+TIMEOUT = 30 * 60  # Seconds; a cold request may have to download a whole watchlist
+
+
+class DaemonUnavailable(Exception):
+    pass
+
+
+def request(command, socket_path=SOCKET_PATH, timeout=TIMEOUT, **params):
+    # Send one request to the daemon and return its decoded response
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        try:
+            conn.connect(socket_path)
+        except OSError as e:
+            raise DaemonUnavailable(f"No analysis daemon at {socket_path} ({e}); start it with python daemon.py") from None
+        conn.sendall(json.dumps({'command': command, **params}).encode('utf-8') + b'\n')
+        with conn.makefile('rb') as reply:
+            line = reply.readline()
+    if not line:
+        raise DaemonUnavailable("The analysis daemon closed the connection")
+    return json.loads(line)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Query the warm analysis daemon")
+    arg_parser.add_argument('--socket', default=SOCKET_PATH)
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('ping')
+    commands.add_parser('daily', help="Daily signals for a watchlist").add_argument('watchlist')
+    commands.add_parser('longterm', help="Long-term signals for a watchlist").add_argument('watchlist')
+    scan = commands.add_parser('scan', help="Screen watchlists with an expression, e.g. 'close > ma20 and rsi < 30'")
+    scan.add_argument('expression')
+    scan.add_argument('watchlists', nargs='+')
+    commands.add_parser('chart', help="Render the Lidao chart to a PNG file").add_argument('output')
+    args = arg_parser.parse_args()
+
+    # Paths are resolved here since the daemon runs in its own working directory
+    params = {}
+    if args.command in ('daily', 'longterm'):
+        params['watchlist'] = os.path.abspath(args.watchlist)
+    elif args.command == 'scan':
+        params = {'expression': args.expression, 'watchlists': [os.path.abspath(path) for path in args.watchlists]}
+    elif args.command == 'chart':
+        params['output'] = os.path.abspath(args.output)
+
+    try:
+        response = request(args.command, args.socket, **params)
+    except DaemonUnavailable as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not response.get('ok'):
+        print(f"Error: {response.get('error')}", file=sys.stderr)
+        return 1
+    if args.command == 'ping':
+        print(f"Daemon up for {response['uptime']:.0f}s, watchlists loaded: {len(response['watchlists'])}")
+    for line in response.get('lines', []):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from market_calendar import MARKET_TZ, session_close
+
+SENTINELS = ('SPY', 'QQQ', 'AAPL', 'MSFT', 'NVDA')  # Liquid names that publish the close early
+QUORUM = 0.8  # Share of sentinels with today's bar before the close counts as published
+CLOSE_DELAY = 5 * 60  # Seconds after the close before the first poll
+POLL_SECONDS = 2 * 60
+DEADLINE = 3 * 3600  # Seconds after the close to give up waiting and run on whatever is there
+FINAL_BAR = timedelta(minutes=1)  # Minute bars are stamped with their start, the last one a minute before the close
+
+
+def market_time(timestamp):
+    # Bars from history_download are naive exchange time, yf.download's are tz-aware
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize(MARKET_TZ) if timestamp.tz is None else timestamp.tz_convert(MARKET_TZ)
+
+
+class CloseTrigger:
+    # Waits for a session's closing bars to be published, by polling a small
+    # sentinel basket's minute bars instead of trusting a fixed wall-clock time.
+    # One downloader call per poll, so waiting costs a handful of ticker fetches.
+    def __init__(self, fetcher, sentinels=SENTINELS, quorum=QUORUM, delay=CLOSE_DELAY,
+                 poll_seconds=POLL_SECONDS, deadline=DEADLINE):
+        self.fetcher = fetcher
+        self.sentinels = list(sentinels)
+        self.quorum = quorum
+        self.delay = delay
+        self.poll_seconds = poll_seconds
+        self.deadline = deadline
+
+    def published(self, session):
+        # The provisional daily bar is dated today all session, so look for the session's final minute bar
+        final_bar = pd.Timestamp(session_close(session)) - FINAL_BAR
+        times = self.fetcher.latest_bar_times(self.sentinels)
+        current = sum(1 for time in times.values() if market_time(time) >= final_bar)
+        return current >= self.quorum * len(self.sentinels)
+
+    async def wait(self, session):
+        # True once session's bars are out, False if the deadline passed first
+        close = session_close(session)
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max((close + timedelta(seconds=self.delay) - datetime.now(MARKET_TZ)).total_seconds(), 0))
+        while True:
+            try:
+                if await loop.run_in_executor(None, self.published, session):
+                    return True
+            except Exception as e:
+                print(f"Error polling sentinels: {e}")
+            if datetime.now(MARKET_TZ) + timedelta(seconds=self.poll_seconds) > close + timedelta(seconds=self.deadline):
+                return False
+            await asyncio.sleep(self.poll_seconds)
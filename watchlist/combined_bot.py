@@ -1,16 +1,34 @@
 import discord
 from discord.ext import commands
-import schedule
 import asyncio
+import functools
+import io
 import re
-from datetime import datetime
-from watchlist_parser import WatchlistParser
-from analyzer import StockAnalyzer
-import yfinance as yf
-import pandas as pd
+import threading
+from datetime import datetime, timedelta
+from watchlist_index import WatchlistIndex
+from run_planner import DAILY, LONGTERM, RunPlanner
+from reports import (DAILY_REPORT, LONGTERM_REPORT, format_alert, render_changes_report, render_daily_report, render_history,
+                     render_longterm_report, render_scan_report)
+from screener import ScanError, compile_scan, scan_frames, scan_period
+from analyzer import LONGTERM_PERIOD
+from data_fetcher import DataFetcher, history_download
+from pipeline import AnalysisPipeline, RateLimiter, RunCancelled, check_cancelled
+from job_runner import WEEKDAYS, JobRunner, RunStatus
+from market_calendar import MARKET_TZ, is_trading_day, last_trading_day_of_week, session_close
+from close_trigger import CloseTrigger
+from intraday import IntradayMonitor
+from report_delivery import SendQueue
+from metrics import metrics, profiled
+from ohlcv_cache import OHLCVCache
+from indicator_state import IndicatorStateStore
+from result_cache import ResultCache
+from signal_history import SignalHistory
+from failure_registry import CircuitBreaker, FailureRegistry, SourceUnavailable
+from lidao_store import LidaoStore
+from chart_service import ChartService
 import os
-import matplotlib.pyplot as plt
-from datetime import datetime
+import pandas as pd
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,154 +40,342 @@ WATCHLIST_CHANNEL_ID_1 = 1249430358198321253  # 每日关注
 WATCHLIST_CHANNEL_ID_2 = 1252364772377231473  # 观察筛选
 WATCHLIST_CHANNEL_ID_3 = 1256436429991710761  # 长期关注观察
 
-CSV_FILE = '2024-Lidao.csv'
+CSV_FILE = '2024-Lidao.csv'  # Readings kept by hand, imported into LIDAO_FILE whenever the file changes
+LIDAO_FILE = 'lidao.db'
 WATCHLIST_FILE_1 = '每日关注_b632d.txt'  # Replace with your actual file path
 WATCHLIST_FILE_2 = '观察筛选_5bee8.txt'  # Replace with your actual file path
+FETCH_CHUNK_SIZE = 25  # Tickers per downloader call; history_download still sends one request per ticker
+FETCH_WORKERS = 4  # Download threads
+COMPUTE_WORKERS = 2  # Indicator/signal processes
+REQUESTS_PER_SECOND = 5  # Global yfinance request budget across all download threads
+OHLCV_CACHE_FILE = 'ohlcv_cache.db'
+INDICATOR_STATE_FILE = 'indicator_state.pkl'
+RESULTS_FILE = 'results_cache.db'  # Signal results per ticker at its last bar, reused by repeat requests
+HISTORY_FILE = 'signal_history.db'  # Every fired signal, for !history and day-over-day changes
+HISTORY_LIMIT = 20  # Events listed by !history
+FAILURES_FILE = 'failures.db'  # Failing tickers and how long to skip them
+METRICS_JSON_FILE = 'metrics.json'  # Stage timings, counters and slow tickers
+METRICS_PROM_FILE = 'metrics.prom'  # Same, in Prometheus text format for a textfile collector
+INTRADAY_CHANNEL_ID = WATCHLIST_CHANNEL_ID_1  # Where intraday crossover alerts are posted
+INTRADAY_POLL_SECONDS = 60  # Poll cadence; a poll that takes longer delays the next one instead of overlapping
+# Minute-bar polls have their own request budget and threads, one request per ticker:
+# 12 requests per second keep 500 tickers inside one poll interval
+INTRADAY_REQUESTS_PER_SECOND = 12
+INTRADAY_FETCH_WORKERS = 8
+WATCHLIST_CHECK_SECONDS = 60  # How often the watchlist files are checked for edits
+STALE_RETRY_SECONDS = 15 * 60  # Wait before re-running tickers without the closing bar; at least the cache's max_age
+STALE_RETRIES = 4
+TRADING_DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+CLOSE_JOB_TIME = "13:00"  # Early enough for 13:00 early closes; the job itself waits for the session's bars
 
 intents = discord.Intents.default()
 intents.message_content = True
 
 bot = commands.Bot(command_prefix='!', intents=intents)
 
-def generate_lists(watchlist_file):
-    parser = WatchlistParser(watchlist_file)
-    watchlist_text = parser.read_watchlist()
-    tickers = parser.extract_tickers(watchlist_text)
-
-    analyzer = StockAnalyzer(tickers)
-    (bullish_list, bearish_list, reduce_position_list, clear_position_list, short_bottom_list, 
-     J1_list, J2_list, turning_point_list, break_zero_list, one_cross_three_list, kdj_buy_list, 
-     kdj_sell_list, e4e12_death_cross_list, e4e50_death_cross_list, e8e21_death_cross_list, 
-     rsi80_overbought_list, macd_death_cross_list, e4e12_golden_cross_list, e4e50_golden_cross_list, 
-     e8e21_golden_cross_list, rsi20_oversold_list, macd_golden_cross_list, above_ma10_list, below_ma10_list) = analyzer.analyze()
-
-    return (bullish_list, bearish_list, reduce_position_list, clear_position_list, short_bottom_list, 
-            J1_list, J2_list, turning_point_list, break_zero_list, one_cross_three_list, kdj_buy_list, 
-            kdj_sell_list, e4e12_death_cross_list, e4e50_death_cross_list, e8e21_death_cross_list, 
-            rsi80_overbought_list, macd_death_cross_list, e4e12_golden_cross_list, e4e50_golden_cross_list, 
-            e8e21_golden_cross_list, rsi20_oversold_list, macd_golden_cross_list, above_ma10_list, below_ma10_list)
-
-async def send_lists_to_channel(channel_id, watchlist_file):
-    channel = bot.get_channel(channel_id)
-    (bullish_list, bearish_list, reduce_position_list, clear_position_list, short_bottom_list, 
-     J1_list, J2_list, turning_point_list, break_zero_list, one_cross_three_list, kdj_buy_list, 
-     kdj_sell_list, e4e12_death_cross_list, e4e50_death_cross_list, e8e21_death_cross_list, 
-     rsi80_overbought_list, macd_death_cross_list, e4e12_golden_cross_list, e4e50_golden_cross_list, 
-     e8e21_golden_cross_list, rsi20_oversold_list, macd_golden_cross_list, above_ma10_list, below_ma10_list) = generate_lists(watchlist_file)
-
-    bullish_msg = "多头排列 (Bullish Alignment): " + ', '.join(bullish_list)
-    bearish_msg = "强烈空头趋势 (Strong Bearish Trend): " + ', '.join(bearish_list)
-    reduce_position_msg = "减仓 (破 ma10): " + ', '.join(reduce_position_list)
-    clear_position_msg = "清仓 (破 ma20): " + ', '.join(clear_position_list)
-    short_bottom_msg = "短底成型 (Short Bottom Formation): " + ', '.join(short_bottom_list)
-    j1_msg = "J1: " + ', '.join(J1_list)
-    j2_msg = "J2: " + ', '.join(J2_list)
-    turning_point_msg = "MA5拐点 (MA 5 Turning Point): " + ', '.join(turning_point_list)
-    break_zero_msg = "破零 (Break Zero): " + ', '.join(break_zero_list)
-    one_cross_three_msg = "一穿三 (One Cross Three): " + ', '.join(one_cross_three_list)
-    kdj_buy_msg = "KDJ 买点 (KDJ Buy Point): " + ', '.join(kdj_buy_list)
-    kdj_sell_msg = "KDJ 超跌 (KDJ Sell Point): " + ', '.join(kdj_sell_list)
-    e4e12_death_cross_msg = "e4e12减四成 (EMA4 and EMA12 Death Cross): " + ', '.join(e4e12_death_cross_list)
-    e4e50_death_cross_msg = "e4e50清仓 (EMA4 and EMA50 Death Cross): " + ', '.join(e4e50_death_cross_list)
-    e8e21_death_cross_msg = "e8e21死叉 (EMA8 and EMA21 Death Cross): " + ', '.join(e8e21_death_cross_list)
-    rsi80_overbought_msg = "RSI80超买 (RSI >= 80): " + ', '.join(rsi80_overbought_list)
-    macd_death_cross_msg = "macd死叉 (MACD Death Cross): " + ', '.join(macd_death_cross_list)
-    e4e12_golden_cross_msg = "e4e12加四成 (EMA4 and EMA12 Golden Cross): " + ', '.join(e4e12_golden_cross_list)
-    e4e50_golden_cross_msg = "e4e50满仓 (EMA4 and EMA50 Golden Cross): " + ', '.join(e4e50_golden_cross_list)
-    e8e21_golden_cross_msg = "e8e21金叉 (EMA8 and EMA21 Golden Cross): " + ', '.join(e8e21_golden_cross_list)
-    rsi20_oversold_msg = "RSI20超卖 (RSI <= 20): " + ', '.join(rsi20_oversold_list)
-    macd_golden_cross_msg = "macd金叉 (MACD Golden Cross): " + ', '.join(macd_golden_cross_list)
-    above_ma10_msg = "ma10之上 (Close Above MA10): " + ', '.join(above_ma10_list)
-    below_ma10_msg = "小仓位ma10之下 (Close Below MA10): " + ', '.join(below_ma10_list)
-
-    await channel.send("** :place_of_worship: 判断趋势:**")
-    await channel.send(bullish_msg)
-    await channel.send(bearish_msg)
-    await channel.send(above_ma10_msg)
-    await channel.send(below_ma10_msg)
-    await channel.send("===============================================================")
-    await channel.send("\n\n** :place_of_worship: 卖点提醒:**")
-    await channel.send(reduce_position_msg)
-    await channel.send(clear_position_msg)
-    await channel.send(e4e12_death_cross_msg)
-    await channel.send(e4e50_death_cross_msg)
-    await channel.send(e8e21_death_cross_msg)
-    await channel.send(rsi80_overbought_msg)
-    await channel.send(macd_death_cross_msg)
-    await channel.send("===============================================================")
-    await channel.send("\n\n** :place_of_worship: 买点提醒:**")
-    await channel.send(j1_msg)
-    await channel.send(j2_msg)
-    await channel.send(short_bottom_msg)
-    await channel.send(turning_point_msg)
-    await channel.send(break_zero_msg)
-    await channel.send(one_cross_three_msg)
-    await channel.send(kdj_buy_msg)
-    await channel.send(e4e12_golden_cross_msg)
-    await channel.send(e4e50_golden_cross_msg)
-    await channel.send(e8e21_golden_cross_msg)
-    await channel.send(rsi20_oversold_msg)
-    await channel.send(macd_golden_cross_msg)
-    await channel.send(kdj_sell_msg)
-
-def generate_longterm_lists(watchlist_file):
-    parser = WatchlistParser(watchlist_file)
-    watchlist_text = parser.read_watchlist()
-    tickers = parser.extract_tickers(watchlist_text)
-
-    analyzer = StockAnalyzer(tickers)
-    (weekly_above_ema13_list, quarterly_above_ma5_list, weekly_below_ema13_list, quarterly_below_ma5_list) = analyzer.analyze_longterm()
-
-    return (weekly_above_ema13_list, quarterly_above_ma5_list, weekly_below_ema13_list, quarterly_below_ma5_list)
-
-async def send_longterm_lists_to_channel(channel_id, watchlist_file, watchlist_name):
-    channel = bot.get_channel(channel_id)
-    (weekly_above_ema13_list, quarterly_above_ma5_list, weekly_below_ema13_list, quarterly_below_ma5_list) = generate_longterm_lists(watchlist_file)
-
-    weekly_above_ema13_msg = f"周线上穿EMA13 (Weekly Close Above EMA13): " + ', '.join(weekly_above_ema13_list)
-    quarterly_above_ma5_msg = f"季度线上穿MA5 (Quarterly Close Above MA5): " + ', '.join(quarterly_above_ma5_list)
-    weekly_below_ema13_msg = f"周线下穿EMA13 (Weekly Close Below EMA13): " + ', '.join(weekly_below_ema13_list)
-    quarterly_below_ma5_msg = f"季度线下穿MA5 (Quarterly Close Below MA5): " + ', '.join(quarterly_below_ma5_list)
-
-    await channel.send(f"** :place_of_worship: ========== {watchlist_name} = 长期趋势 =======**")
-    await channel.send(weekly_above_ema13_msg)
-    await channel.send(quarterly_above_ma5_msg)
-    await channel.send(weekly_below_ema13_msg)
-    await channel.send(quarterly_below_ma5_msg)
+ohlcv_cache = OHLCVCache(OHLCV_CACHE_FILE)
+failure_registry = FailureRegistry(FAILURES_FILE)
+fetcher = DataFetcher(chunk_size=FETCH_CHUNK_SIZE, downloader=history_download, cache=ohlcv_cache,
+                      rate_limiter=RateLimiter(REQUESTS_PER_SECOND), failures=failure_registry,
+                      breaker=CircuitBreaker())
+pipeline = AnalysisPipeline(fetcher, fetch_workers=FETCH_WORKERS, compute_workers=COMPUTE_WORKERS)
+indicator_states = IndicatorStateStore(INDICATOR_STATE_FILE)
+state_lock = threading.Lock()  # Held by every run that advances, evicts or saves indicator_states
+result_cache = ResultCache(RESULTS_FILE)
+signal_history = SignalHistory(HISTORY_FILE)
+send_queue = SendQueue()
+lidao_store = LidaoStore(LIDAO_FILE, csv_path=CSV_FILE)
+chart_service = ChartService(lidao_store, fetcher)
+watchlist_index = WatchlistIndex([WATCHLIST_FILE_1, WATCHLIST_FILE_2], keep=[chart_service.ticker])
+close_trigger = CloseTrigger(fetcher)
+intraday_fetcher = DataFetcher(chunk_size=FETCH_CHUNK_SIZE, downloader=history_download,
+                               rate_limiter=RateLimiter(INTRADAY_REQUESTS_PER_SECOND), breaker=CircuitBreaker())
+intraday_monitor = IntradayMonitor(pipeline, poll_pipeline=AnalysisPipeline(
+    intraday_fetcher, fetch_workers=INTRADAY_FETCH_WORKERS, compute_workers=0))
+
+# Signals each channel subscribes to; only the indicators those need get computed
+CHANNEL_SIGNALS = {
+    WATCHLIST_CHANNEL_ID_1: [name for _, names in DAILY_REPORT for name in names],
+    WATCHLIST_CHANNEL_ID_2: [name for _, names in DAILY_REPORT for name in names],
+    WATCHLIST_CHANNEL_ID_3: LONGTERM_REPORT,
+}
+
+# Reports as (kind, channel, watchlist file, watchlist name), and the sessions each is due at the close of
+DAILY_REPORTS = [
+    (DAILY, WATCHLIST_CHANNEL_ID_1, WATCHLIST_FILE_1, "每日关注"),
+    (DAILY, WATCHLIST_CHANNEL_ID_2, WATCHLIST_FILE_2, "观察筛选"),
+]
+LONGTERM_REPORTS = [
+    (LONGTERM, WATCHLIST_CHANNEL_ID_3, WATCHLIST_FILE_1, "每日关注"),
+    (LONGTERM, WATCHLIST_CHANNEL_ID_3, WATCHLIST_FILE_2, "观察筛选"),
+]
+# Channels whose scheduled daily reports list only signals that newly fired or cleared since the previous run
+CHANGES_ONLY_CHANNELS = set()
+REPORT_SCHEDULE = [
+    (is_trading_day, DAILY_REPORTS),
+    (last_trading_day_of_week, LONGTERM_REPORTS),  # Fridays, or Thursday when Friday is a holiday
+]
+
+def read_tickers(watchlist_file):
+    # Reparsed only when the file changed
+    return watchlist_index.tickers(watchlist_file)
+
+def generate_reports(reports, only=None, status=None):
+    # One plan for every report: shared tickers are fetched and analyzed once.
+    # Returns the per-report results, the tickers each report could not cover
+    # and each report's changes since the previous run.
+    planner = RunPlanner(pipeline, state_store=indicator_states, result_cache=result_cache, history=signal_history)
+    for i, (kind, channel_id, watchlist_file, _) in enumerate(reports):
+        tickers = [ticker for ticker in read_tickers(watchlist_file) if only is None or ticker in only]
+        planner.add(i, tickers, kind, CHANNEL_SIGNALS.get(channel_id))
+    with state_lock:
+        results = planner.run(progress=status.update if status else None,
+                              cancel_event=status.cancel_event if status else None)
+    skipped = {job.key: failure_registry.summary(job.tickers) for job in planner.jobs}
+    changes = {job.key: signal_history.diff(job.tickers, list(results[job.key])) for job in planner.jobs}
+    return results, skipped, changes
+
+async def run_analysis(name, func, *args, report=False, label=None):
+    # Run a blocking analysis in a worker thread so the event loop keeps serving
+    # heartbeats and commands; progress is visible through !status.
+    # report: a report run, the only kind !profile applies to
+    # label: job label for the metrics when name carries user input, which would
+    # otherwise add a time series per distinct name
+    global profile_next_run
+    status = RunStatus(name)
+    active_runs.add(status)
+    call = functools.partial(func, *args, status=status)
+    if report and profile_next_run:
+        profile_next_run = False
+        call = functools.partial(profiled, call, datetime.now().strftime('profile_%Y%m%d_%H%M%S.prof'))
+    try:
+        with metrics.timer('job', job=label or name):
+            return await asyncio.get_running_loop().run_in_executor(None, call)
+    finally:
+        active_runs.discard(status)
+        metrics.write(METRICS_JSON_FILE, METRICS_PROM_FILE)
+
+async def send_reports(reports, only=None):
+    # only: re-run just these tickers, e.g. the ones that lacked the closing bar the first time
+    name = ', '.join(f"{kind} {watchlist_name}" for kind, _, _, watchlist_name in reports)
+    try:
+        results, skipped, changes = await run_analysis(name, generate_reports, reports, only, report=True)
+    except (RunCancelled, SourceUnavailable) as e:
+        notice = f"Analysis of {name} was cancelled." if isinstance(e, RunCancelled) else \
+            f"Analysis of {name} stopped early, market data is unavailable: {e}"
+        for channel_id in dict.fromkeys(channel_id for _, channel_id, _, _ in reports):
+            await send_queue.send(bot.get_channel(channel_id), notice)
+        return
+
+    with metrics.timer('report_delivery', job=name):
+        for i, (kind, channel_id, watchlist_file, watchlist_name) in enumerate(reports):
+            late = [ticker for ticker in read_tickers(watchlist_file) if ticker in only] if only else None
+            if late == []:
+                continue
+            if kind == DAILY and channel_id in CHANGES_ONLY_CHANNELS:
+                lines = render_changes_report(changes[i], watchlist_name, skipped[i])
+            elif kind == DAILY:
+                lines = render_daily_report(results[i], skipped[i])
+            else:
+                lines = render_longterm_report(results[i], watchlist_name, skipped[i])
+            if late:
+                lines.insert(0, f"** :hourglass: 补充 (Late data): {', '.join(late)}**")
+            await send_queue.send_report(bot.get_channel(channel_id), lines)
+    metrics.write(METRICS_JSON_FILE, METRICS_PROM_FILE)
+
+def run_scan(expression, status=None):
+    # Screen both watchlists at their latest bar; bars come from the OHLCV cache where current
+    tickers = list(dict.fromkeys(ticker for watchlist_file in (WATCHLIST_FILE_1, WATCHLIST_FILE_2)
+                                 for ticker in read_tickers(watchlist_file)))
+    period = scan_period(expression)
+    frames = fetcher.download(tickers, period=period)
+    check_cancelled(status.cancel_event if status else None)
+    return scan_frames(frames, expression), tickers, failure_registry.summary(tickers)
+
+def evict_cache(status=None):
+    # Keep history only for tickers still on a watchlist (plus QQQ for the Lidao chart)
+    evicted = ohlcv_cache.evict(watchlist_index.universe())
+    with state_lock:
+        indicator_states.evict(evicted)
+        indicator_states.save()
+
+def sync_watchlists(changes, status=None):
+    # Backfill history for tickers new to every watchlist and forget the ones no watchlist lists anymore
+    if changes.added:
+        print(f"Backfilling {len(changes.added)} new tickers: {', '.join(changes.added)}")
+        fetcher.download(changes.added, period=LONGTERM_PERIOD)
+    if changes.removed:
+        print(f"Evicting {len(changes.removed)} removed tickers: {', '.join(changes.removed)}")
+        ohlcv_cache.drop(changes.removed)
+        result_cache.drop(changes.removed)
+        with state_lock:
+            indicator_states.evict(changes.removed)
+            indicator_states.save()
+
+def due_reports(session):
+    return [report for is_due, reports in REPORT_SCHEDULE if is_due(session) for report in reports]
+
+def stale_tickers(reports, session):
+    # Tickers without the session's closing bar: either the cached bars stop before
+    # the session, or today's bar was fetched while it was provisional. Failed tickers
+    # are retried too, unless the failure registry still skips them.
+    tickers = list(dict.fromkeys(ticker for _, _, watchlist_file, _ in reports for ticker in read_tickers(watchlist_file)))
+    _, failing = failure_registry.partition(tickers)
+    close = session_close(session).timestamp()
+    stale = []
+    for ticker in tickers:
+        if ticker in failing:
+            continue
+        last_date = ohlcv_cache.last_date(ticker, '1d')
+        if last_date is None or last_date < pd.Timestamp(session) or ohlcv_cache.fetched_at(ticker, '1d') < close:
+            stale.append(ticker)
+    return stale
+
+async def market_close_job():
+    # Starts as soon as the sentinel basket has the session's closing bars
+    # instead of at a fixed time, skips holidays, and then re-runs only the
+    # tickers whose bar was not out yet. Every report due at the close runs as
+    # a single plan, so the week's last session fetches the union of both
+    # watchlists once for the daily and long-term reports together.
+    session = datetime.now(MARKET_TZ).date()
+    if not is_trading_day(session):
+        print(f"Market closed on {session}, no close reports")
+        return
+    reports = due_reports(session)
+    if not await close_trigger.wait(session):
+        print(f"Closing bars for {session} not confirmed by the sentinels, running on the data available")
+    await send_reports(reports)
+    for _ in range(STALE_RETRIES):
+        stale = await asyncio.get_running_loop().run_in_executor(None, stale_tickers, reports, session)
+        if not stale:
+            return
+        print(f"{len(stale)} tickers lack the {session} bar, retrying in {STALE_RETRY_SECONDS}s: {', '.join(stale)}")
+        await asyncio.sleep(STALE_RETRY_SECONDS)
+        await send_reports(reports, only=set(stale))
+
+async def intraday_job():
+    # Poll minute bars through the session and alert on confirmed signal changes
+    session = datetime.now(MARKET_TZ).date()
+    if not is_trading_day(session):
+        return
+    tickers = list(dict.fromkeys(ticker for _, _, watchlist_file, _ in DAILY_REPORTS
+                                 for ticker in read_tickers(watchlist_file)))
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, intraday_monitor.start_session, tickers, session)
+    close = session_close(session)
+    while datetime.now(MARKET_TZ) < close:
+        started = loop.time()
+        try:
+            alerts = await loop.run_in_executor(None, intraday_monitor.poll, tickers)
+        except SourceUnavailable as e:
+            print(f"Intraday poll skipped: {e}")
+            alerts = []
+        if alerts:
+            await send_queue.send_report(bot.get_channel(INTRADAY_CHANNEL_ID),
+                                         [format_alert(*alert) for alert in alerts])
+        await asyncio.sleep(max(INTRADAY_POLL_SECONDS - (loop.time() - started), 0))
+
+async def watchlist_job():
+    # Indicator state is not shared safely with a running analysis, so wait for a quiet moment
+    if active_runs:
+        return
+    changes = watchlist_index.changes()
+    if changes:
+        await run_analysis("watchlist sync", sync_watchlists, changes)
+
+async def evict_job():
+    await run_analysis("cache eviction", evict_cache)
+
+def missed_close_job(now=None):
+    # True if the bot started after today's close job was due but before its reports
+    # could have gone out; they never do before the trigger's first poll, so none repeat
+    now = now or datetime.now(MARKET_TZ)
+    session = now.date()
+    hour, minute = (int(part) for part in CLOSE_JOB_TIME.split(':'))
+    due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return is_trading_day(session) and due <= now < session_close(session) + timedelta(seconds=close_trigger.delay)
 
 def schedule_job():
-    schedule.every().monday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_1, WATCHLIST_FILE_1), bot.loop))
-    schedule.every().tuesday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_1, WATCHLIST_FILE_1), bot.loop))
-    schedule.every().wednesday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_1, WATCHLIST_FILE_1), bot.loop))
-    schedule.every().thursday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_1, WATCHLIST_FILE_1), bot.loop))
-    schedule.every().friday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_1, WATCHLIST_FILE_1), bot.loop))
-    
-    schedule.every().monday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_2, WATCHLIST_FILE_2), bot.loop))
-    schedule.every().tuesday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_2, WATCHLIST_FILE_2), bot.loop))
-    schedule.every().wednesday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_2, WATCHLIST_FILE_2), bot.loop))
-    schedule.every().thursday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_2, WATCHLIST_FILE_2), bot.loop))
-    schedule.every().friday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_lists_to_channel(WATCHLIST_CHANNEL_ID_2, WATCHLIST_FILE_2), bot.loop))
-
-    schedule.every().friday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_longterm_lists_to_channel(WATCHLIST_CHANNEL_ID_3, WATCHLIST_FILE_1, "每日关注"), bot.loop))
-    schedule.every().friday.at("16:30", "America/New_York").do(lambda: asyncio.run_coroutine_threadsafe(send_longterm_lists_to_channel(WATCHLIST_CHANNEL_ID_3, WATCHLIST_FILE_2, "观察筛选"), bot.loop))
+    job_runner.every(TRADING_DAYS, CLOSE_JOB_TIME, "market close reports", market_close_job)
+    job_runner.every(TRADING_DAYS, "09:31", "intraday alerts", intraday_job)
+    job_runner.every(WEEKDAYS, "18:00", "cache eviction", evict_job)
+    job_runner.every_seconds(WATCHLIST_CHECK_SECONDS, "watchlist sync", watchlist_job)
+
+job_runner = JobRunner()
+active_runs = set()
+profile_next_run = False
+schedule_job()
 
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user.name} ({bot.user.id})')
-    schedule_job()
-    while True:
-        schedule.run_pending()
-        await asyncio.sleep(1)
+    # on_ready fires again on every reconnect; the runner only starts once
+    if job_runner.start():
+        print('Job runner started')
+        if missed_close_job():
+            job_runner.run_now("market close reports (catch-up)", market_close_job)
 
 @bot.command()
 async def getdata(ctx):
-    await send_lists_to_channel(WATCHLIST_CHANNEL_ID_1, WATCHLIST_FILE_1)
-    await send_lists_to_channel(WATCHLIST_CHANNEL_ID_2, WATCHLIST_FILE_2)
+    await send_reports(DAILY_REPORTS)
 
 @bot.command()
 async def getlongterm(ctx):
-    await send_longterm_lists_to_channel(WATCHLIST_CHANNEL_ID_3, WATCHLIST_FILE_1, "每日关注")
-    await send_longterm_lists_to_channel(WATCHLIST_CHANNEL_ID_3, WATCHLIST_FILE_2, "观察筛选")
+    await send_reports(LONGTERM_REPORTS)
+
+@bot.command()
+async def status(ctx):
+    if not active_runs:
+        await ctx.send('No analysis is running.')
+        return
+    await ctx.send('\n'.join(run.describe() for run in active_runs))
+
+@bot.command()
+async def cancel(ctx):
+    if not active_runs:
+        await ctx.send('No analysis is running.')
+        return
+    for run in active_runs:
+        run.cancel()
+    await ctx.send(f'Cancelling {len(active_runs)} running analysis job(s).')
+
+@bot.command()
+async def profile(ctx):
+    global profile_next_run
+    profile_next_run = True
+    await ctx.send('The next report run will be profiled.')
+
+@bot.command()
+async def changes(ctx):
+    # Newly fired and cleared daily signals per watchlist, from the recorded history only
+    for _, _, watchlist_file, watchlist_name in DAILY_REPORTS:
+        tickers = read_tickers(watchlist_file)
+        names = [name for _, names in DAILY_REPORT for name in names]
+        diff = await asyncio.get_running_loop().run_in_executor(None, signal_history.diff, tickers, names)
+        await send_queue.send_report(ctx.channel, render_changes_report(diff, watchlist_name))
+
+@bot.command()
+async def history(ctx, ticker: str, signal: str = None):
+    # e.g. !history NVDA J1
+    events = signal_history.events(ticker=ticker.upper(), signal=signal, limit=HISTORY_LIMIT)
+    await send_queue.send_report(ctx.channel, render_history(events))
+
+@bot.command()
+async def scan(ctx, *, expression: str):
+    # e.g. !scan close > ma20 and rsi < 30 and cross(ema4, ema12)
+    expression = expression.strip('` ')
+    try:
+        compile_scan(expression)
+    except ScanError as e:
+        await ctx.send(f'Invalid scan expression: {e}')
+        return
+    try:
+        matches, tickers, skipped = await run_analysis(f"scan {expression}", run_scan, expression, label='scan')
+    except (RunCancelled, SourceUnavailable) as e:
+        await ctx.send('Scan was cancelled.' if isinstance(e, RunCancelled) else
+                       f'Scan stopped early, market data is unavailable: {e}')
+        return
+    await send_queue.send_report(ctx.channel, render_scan_report(expression, matches, len(tickers), skipped))
 
 @bot.command()
 async def cat(ctx, *, message: str):
@@ -185,86 +391,22 @@ async def cat(ctx, *, message: str):
             lidao_spx = float(match.group(5))
             lidao_nasdaq = float(match.group(7))
 
-            # Load existing data
-            if os.path.exists(CSV_FILE):
-                existing_data = pd.read_csv(CSV_FILE, parse_dates=['Date'])
-                existing_data['Date'] = pd.to_datetime(existing_data['Date'])
-            else:
-                existing_data = pd.DataFrame(columns=['Date', 'Lidao-1.0', 'Lidao-SPX', 'Lidao-NASDAQ'])
-
-            # Check if the date already exists in the CSV
-            date_exists = existing_data['Date'] == date
-            if date_exists.any():
-                # Update existing entry
-                existing_data.loc[date_exists, ['Lidao-1.0', 'Lidao-SPX', 'Lidao-NASDAQ']] = [lidao_1, lidao_spx, lidao_nasdaq]
-            else:
-                # Append new entry
-                new_entry = pd.DataFrame([[date, lidao_1, lidao_spx, lidao_nasdaq]], columns=['Date', 'Lidao-1.0', 'Lidao-SPX', 'Lidao-NASDAQ'])
-                existing_data = pd.concat([existing_data, new_entry], ignore_index=True)
-
-            # Save data back to CSV
-            existing_data.to_csv(CSV_FILE, index=False)
+            lidao_store.upsert(date, lidao_1, lidao_spx, lidao_nasdaq)
 
-            await ctx.send('Data has been added to CSV. Generating plot...')
+            await ctx.send('Data has been recorded. Generating plot...')
             await generate_and_send_plot(ctx)
         else:
             await ctx.send('Message format is incorrect.')
 
 async def generate_and_send_plot(ctx):
     try:
-        # Load the lidao data from the CSV file
-        lidao_data = pd.read_csv(CSV_FILE, parse_dates=['Date'], index_col='Date')
-
-        # Ensure that all dates are parsed correctly
-        lidao_data.index = pd.to_datetime(lidao_data.index)
-
-        # Check if the Lidao-NASDAQ column needs cleaning
-        if lidao_data['Lidao-NASDAQ'].dtype == 'object':
-            lidao_data['Lidao-NASDAQ'] = lidao_data['Lidao-NASDAQ'].str.replace('[^\d.-]', '', regex=True)
-            lidao_data['Lidao-NASDAQ'] = pd.to_numeric(lidao_data['Lidao-NASDAQ'])
-
-        # Fetching the QQQ data starting from the earliest date in lidao data
-        start_date = lidao_data.index.min()
-        qqq_data = yf.download('QQQ', start=start_date.strftime('%Y-%m-%d'))
-
-        # Check if all data are aligned by date
-        combined_data = pd.DataFrame(index=qqq_data.index)
-        combined_data['QQQ Close'] = qqq_data['Close']
-        combined_data = combined_data.join(lidao_data, how='inner')  # Inner join to ensure all data are aligned
-
-        # Setting up the plot with secondary y-axis
-        plt.style.use('dark_background')
-        fig, ax1 = plt.subplots(figsize=(10, 6))
-
-        # First axis for QQQ
-        ax1.set_xlabel('Date')
-        ax1.set_ylabel('QQQ Close', color='cyan')
-        ax1.plot(combined_data.index, combined_data['QQQ Close'], label='QQQ Close', color='cyan', marker='*', linestyle='-', markersize=8)
-        ax1.tick_params(axis='y', labelcolor='cyan')
-
-        # Second axis for lidao data
-        ax2 = ax1.twinx()
-        ax2.set_ylabel('Lidao Indices', color='magenta')
-        ax2.plot(combined_data.index, combined_data['Lidao-1.0'], label='Lidao-1.0', color='magenta', marker='s', linestyle='-', markersize=6)
-        ax2.plot(combined_data.index, combined_data['Lidao-SPX'], label='Lidao-SPX', color='lime', marker='^', linestyle='-', markersize=6)
-        ax2.plot(combined_data.index, combined_data['Lidao-NASDAQ'], label='Lidao-NASDAQ', color='yellow', marker='D', linestyle='-', markersize=6)
-        ax2.tick_params(axis='y', labelcolor='magenta')
-
-        # Adjust layout to make space for title
-        fig.tight_layout(rect=[0, 0, 1, 0.95])  # Adjust the rectangle in which the plot fits (left, bottom, right, top)
-        fig.legend(loc='upper left', bbox_to_anchor=(0.1,0.9))
-        plt.title('QQQ Close and Lidao Indices on Dark Background', fontsize=16, color='white')
-
-        # Save the plot to a file with the current date as the filename
+        png = await asyncio.get_running_loop().run_in_executor(None, chart_service.render)
         filename = datetime.now().strftime('%Y-%m-%d') + '_QQQ_and_Lidao_Indices_Dark.png'
-        plt.savefig(filename)
 
         # Send the plot to the Discord channel
         channel = bot.get_channel(CHAT_OUTPUT_CHANNEL_ID)
-        await channel.send(file=discord.File(filename))
+        await channel.send(file=discord.File(io.BytesIO(png), filename=filename))
         await ctx.send('Plot Generation Done.')
-
-        print(f"File saved as {filename}")
     except Exception as e:
         await ctx.send(f'Error generating plot: {e}')
         print(f'Error generating plot: {e}')
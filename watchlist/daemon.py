@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+
+from chart_service import ChartService
+from client import SOCKET_PATH
+from data_fetcher import DataFetcher, history_download
+from failure_registry import CircuitBreaker, FailureRegistry
+from indicator_state import IndicatorStateStore
+from lidao_store import LidaoStore
+from metrics import metrics
+from ohlcv_cache import OHLCVCache
+from reports import render_daily_report, render_longterm_report, render_scan_report
+from result_cache import ResultCache
+from run_planner import DAILY, LONGTERM, RunPlanner
+from screener import scan_frames, scan_period
+from watchlist_index import WatchlistIndex
+
+
+class AnalysisDaemon:
+    # Everything the CLI entry points used to rebuild per invocation, kept warm:
+    # imports, the OHLCV and result caches, incremental indicator state, the
+    # Lidao chart figure and parsed watchlists. Analysis requests run one at a
+    # time because the indicator state is not thread-safe; pings do not wait.
+    def __init__(self, lidao_csv=None):
+        self.cache = OHLCVCache()
+        self.failures = FailureRegistry()
+        self.fetcher = DataFetcher(downloader=history_download, cache=self.cache, failures=self.failures,
+                                   breaker=CircuitBreaker())
+        self.states = IndicatorStateStore(path=None)
+        self.results = ResultCache()
+        self.chart = ChartService(LidaoStore(csv_path=lidao_csv), self.fetcher)
+        self.watchlists = WatchlistIndex()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.handlers = {'ping': self.ping, 'daily': self.daily, 'longterm': self.longterm,
+                         'scan': self.scan, 'chart': self.render_chart}
+
+    def tickers(self, path):
+        # Parsed once per version of the file
+        return self.watchlists.tickers(path)
+
+    def plan(self, path, kind):
+        planner = RunPlanner(fetcher=self.fetcher, state_store=self.states, result_cache=self.results)
+        planner.add(0, self.tickers(path), kind)
+        with self.lock:
+            results = planner.run()[0]
+        return results, self.failures.summary(planner.jobs[0].tickers)
+
+    def ping(self, request):
+        return {'uptime': time.time() - self.started, 'watchlists': list(self.watchlists.watchlists)}
+
+    def daily(self, request):
+        results, skipped = self.plan(request['watchlist'], DAILY)
+        return {'lines': render_daily_report(results, skipped)}
+
+    def longterm(self, request):
+        results, skipped = self.plan(request['watchlist'], LONGTERM)
+        name = os.path.splitext(os.path.basename(request['watchlist']))[0]
+        return {'lines': render_longterm_report(results, name, skipped)}
+
+    def scan(self, request):
+        expression = request['expression']
+        tickers = list(dict.fromkeys(ticker for path in request['watchlists'] for ticker in self.tickers(path)))
+        period = scan_period(expression)
+        with self.lock:
+            matches = scan_frames(self.fetcher.download(tickers, period=period), expression)
+        return {'lines': render_scan_report(expression, matches, len(tickers), self.failures.summary(tickers))}
+
+    def render_chart(self, request):
+        png = self.chart.render()
+        with open(request['output'], 'wb') as file:
+            file.write(png)
+        return {'lines': [f"Chart saved as {request['output']}"]}
+
+    def handle(self, request):
+        handler = self.handlers.get(request.get('command'))
+        if handler is None:
+            return {'ok': False, 'error': f"Unknown command: {request.get('command')}"}
+        try:
+            with metrics.timer('daemon', command=request['command']):
+                return {'ok': True, **handler(request)}
+        except Exception as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    # One JSON request line in, one JSON response line out
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {'ok': False, 'error': "Malformed request"}
+        else:
+            response = self.server.daemon.handle(request)
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, daemon):
+        self.daemon = daemon
+        if os.path.exists(path):
+            # Left over from a daemon that did not shut down cleanly
+            os.remove(path)
+        super().__init__(path, RequestHandler)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Keep the watchlist analysis warm behind a Unix socket")
+    arg_parser.add_argument('--socket', default=SOCKET_PATH)
+    arg_parser.add_argument('--lidao-csv', default=None, help="Lidao readings CSV to import whenever it changes")
+    arg_parser.add_argument('--preload', nargs='*', default=[], help="Watchlists to run the daily signals for at start")
+    args = arg_parser.parse_args()
+
+    daemon = AnalysisDaemon(args.lidao_csv)
+    for path in args.preload:
+        daemon.daily({'watchlist': os.path.abspath(path)})
+    server = DaemonServer(args.socket, daemon)
+    print(f"Listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import random
+import time
+import yfinance as yf
+import pandas as pd
+from failure_registry import NO_DATA, TRANSIENT, classify
+from metrics import metrics
+from ohlcv_cache import CACHEABLE_INTERVALS, COLUMNS, period_start
+
+DEFAULT_CHUNK_SIZE = 50
+
+
+def history_download(tickers, group_by='ticker', progress=False, **kwargs):
+    # Thread-safe stand-in for yf.download. yf.download collects results in
+    # module-level state, so concurrent calls from several threads can mix
+    # tickers up; Ticker.history keeps everything per call.
+    frames = {}
+    for ticker in tickers:
+        try:
+            data = yf.Ticker(ticker).history(**kwargs)
+        except Exception as e:
+            # Network trouble fails the whole chunk so it is retried; anything else only loses this ticker
+            if classify(e) == TRANSIENT:
+                raise
+            print(f"Error downloading {ticker}: {e}")
+            continue
+        if data.empty:
+            continue
+        if data.index.tz is not None:
+            data.index = data.index.tz_localize(None)
+        frames[ticker] = data[[column for column in COLUMNS if column in data]]
+    return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+
+class DataFetcher:
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, downloader=None, cache=None,
+                 rate_limiter=None, max_retries=3, backoff=1.0, failures=None, breaker=None):
+        # rate_limiter: shared RateLimiter, charged one token per ticker, i.e. per request
+        # max_retries/backoff: retries per chunk with exponential backoff, in seconds
+        # failures: FailureRegistry; tickers in their negative-cache period are not requested
+        # breaker: CircuitBreaker; raises SourceUnavailable instead of requesting while open
+        self.chunk_size = chunk_size
+        self.downloader = downloader or yf.download
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failures = failures
+        self.breaker = breaker
+
+    def chunks(self, tickers):
+        for i in range(0, len(tickers), self.chunk_size):
+            yield tickers[i:i + self.chunk_size]
+
+    def download(self, tickers, period=None, interval='1d', start=None, end=None, **kwargs):
+        tickers = list(dict.fromkeys(tickers))
+        if self.failures is not None:
+            tickers, skipped = self.failures.partition(tickers)
+            metrics.increment('fetch_skipped', len(skipped))
+        if self.cache is None or interval not in CACHEABLE_INTERVALS or kwargs:
+            return self._download(tickers, period=period, interval=interval, start=start, end=end, **kwargs)
+
+        start = pd.Timestamp(start) if start is not None else period_start(period)
+        self.refresh(tickers, interval, start)
+        frames = {}
+        for ticker in tickers:
+            frame = self.cache.load(ticker, interval, start, end)
+            if not frame.empty:
+                frames[ticker] = frame
+        return frames
+
+    def latest_bar_times(self, tickers, period='1d', interval='1m'):
+        # Start time of each ticker's newest published bar, straight from the source.
+        # Daily bars are dated today from the open, minute bars show how far the session got.
+        frames = self._download(list(tickers), period=period, interval=interval)
+        return {ticker: frame.index[-1] for ticker, frame in frames.items()}
+
+    def refresh(self, tickers, interval, start):
+        # Group stale tickers by the date their delta fetch starts from,
+        # so tickers last updated on the same day share downloader calls
+        groups = {}
+        for ticker in tickers:
+            fetch_start = self.cache.fetch_start(ticker, interval, start)
+            if fetch_start is not None:
+                groups.setdefault(fetch_start, []).append(ticker)
+        stale = sum(len(group) for group in groups.values())
+        metrics.increment('cache_hits', len(tickers) - stale, interval=interval)
+        metrics.increment('cache_misses', stale, interval=interval)
+
+        readjusted = {}
+        for fetch_start, group in groups.items():
+            frames = self._download(group, interval=interval, start=fetch_start.strftime('%Y-%m-%d'))
+            for ticker in group:
+                if self.cache.adjusted(ticker, interval, frames.get(ticker)):
+                    # A split or dividend re-adjusted the history; the cached bars are all stale
+                    covered_from = self.cache.invalidate(ticker, interval)
+                    readjusted.setdefault(min(covered_from, start), []).append(ticker)
+                    continue
+                self.cache.store(ticker, interval, frames.get(ticker), fetch_start)
+
+        metrics.increment('cache_readjusted', sum(len(group) for group in readjusted.values()), interval=interval)
+        for fetch_start, group in readjusted.items():
+            frames = self._download(group, interval=interval, start=fetch_start.strftime('%Y-%m-%d'))
+            for ticker in group:
+                self.cache.store(ticker, interval, frames.get(ticker), fetch_start)
+
+    def _download(self, tickers, **kwargs):
+        # One downloader call per chunk. Yahoo serves one symbol per request, so both
+        # yf.download and history_download request every ticker of the chunk separately;
+        # the rate limiter is charged for each of them
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        frames = {}
+        for chunk in self.chunks(tickers):
+            data = self._download_chunk(chunk, **kwargs)
+            chunk_frames = split_frames(data, chunk)
+            if data is not None:
+                self.record_outcome(chunk, chunk_frames)
+            frames.update(chunk_frames)
+        return frames
+
+    def record_outcome(self, chunk, frames):
+        if not frames and len(chunk) > 1:
+            # Nothing at all for a whole chunk says more about the source than the tickers
+            self.record_chunk_failure(chunk, "empty response")
+            return
+        if self.breaker is not None:
+            self.breaker.record_success()
+        if self.failures is None:
+            return
+        self.failures.record_success([ticker for ticker in chunk if ticker in frames])
+        for ticker in chunk:
+            if ticker not in frames:
+                kind = self.failures.record(ticker, NO_DATA, "no data returned")
+                metrics.increment('ticker_failures', reason=kind)
+
+    def record_chunk_failure(self, chunk, message):
+        if self.breaker is not None:
+            self.breaker.record_failure()
+        if self.failures is not None:
+            for ticker in chunk:
+                self.failures.record(ticker, TRANSIENT, message)
+
+    def _download_chunk(self, chunk, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            if self.breaker is not None:
+                self.breaker.check()
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(len(chunk))
+            try:
+                with metrics.timer('fetch', tickers=chunk):
+                    return self.downloader(chunk, group_by='ticker', progress=False, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if attempt == self.max_retries or kind != TRANSIENT:
+                    # Retrying only helps with transient errors
+                    print(f"Error downloading {', '.join(chunk)}: {e}")
+                    metrics.increment('fetch_failures', len(chunk))
+                    if kind == TRANSIENT:
+                        self.record_chunk_failure(chunk, str(e))
+                    elif self.failures is not None:
+                        for ticker in chunk:
+                            self.failures.record(ticker, kind, str(e))
+                    return None
+                metrics.increment('fetch_retries')
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+                print(f"Error downloading {', '.join(chunk)}: {e}... retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def split_frames(data, tickers):
+    # Split a grouped download into one flat OHLCV frame per ticker
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if isinstance(data.columns, pd.MultiIndex):
+        available = {str(name).upper(): name for name in data.columns.get_level_values(0).unique()}
+        for ticker in tickers:
+            name = available.get(ticker.upper())
+            if name is None:
+                continue
+            frame = data[name].dropna(how='all').copy()
+            if not frame.empty:
+                frames[ticker] = frame
+    elif len(tickers) == 1:
+        frame = data.dropna(how='all').copy()
+        if not frame.empty:
+            frames[tickers[0]] = frame
+    return frames
@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+import time
+
+FAILURES_FILE = 'failures.db'
+NO_DATA = 'no_data'
+DELISTED = 'delisted'
+TRANSIENT = 'transient'
+DELISTED_AFTER = 5  # Consecutive empty fetches before a ticker is treated as delisted
+# First skip period in seconds, doubled per repeat. Yahoo also answers empty when
+# throttling, so one empty fetch only costs a healthy ticker a short skip.
+NEGATIVE_TTL = {NO_DATA: 15 * 60, DELISTED: 7 * 24 * 3600}
+MAX_TTL = 30 * 24 * 3600
+BREAKER_THRESHOLD = 3  # Consecutive failed chunks before the data source is considered down
+BREAKER_COOLDOWN = 5 * 60
+
+
+class SourceUnavailable(Exception):
+    pass
+
+
+def classify(error):
+    # Failure kind for an exception raised while downloading
+    message = str(error).lower()
+    if 'delisted' in message or 'no timezone found' in message:
+        return DELISTED
+    if 'no data found' in message or 'no price data' in message:
+        return NO_DATA
+    return TRANSIENT
+
+
+class FailureRegistry:
+    # Tickers whose last fetch failed, with the kind of failure. Permanent-looking
+    # failures are skipped for a TTL that doubles on every repeat, so a delisted
+    # or mistyped symbol stops costing a download every run. Transient failures
+    # are only remembered for the report.
+    def __init__(self, db_path=FAILURES_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS failures (
+                    ticker TEXT PRIMARY KEY,
+                    kind TEXT, message TEXT, strikes INTEGER,
+                    first_seen REAL, last_seen REAL, skip_until REAL
+                )
+            """)
+
+    def record(self, ticker, kind, message='', now=None):
+        now = now or time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT kind, strikes, first_seen FROM failures WHERE ticker = ?",
+                                    (ticker,)).fetchone()
+            previous_kind, strikes, first_seen = row or (None, 0, now)
+            if kind == NO_DATA and previous_kind == DELISTED:
+                kind = DELISTED
+            strikes = strikes + 1 if previous_kind == kind else 1
+            if kind == NO_DATA and strikes >= DELISTED_AFTER:
+                kind, strikes = DELISTED, 1
+            skip_until = now + min(NEGATIVE_TTL[kind] * 2 ** (strikes - 1), MAX_TTL) if kind in NEGATIVE_TTL else 0
+            self.conn.execute("INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (ticker, kind, message, strikes, first_seen, now, skip_until))
+        return kind
+
+    def record_success(self, tickers):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM failures WHERE ticker = ?", [(ticker,) for ticker in tickers])
+
+    def partition(self, tickers, now=None):
+        # (tickers to fetch, {ticker: kind} still inside their skip period)
+        now = now or time.time()
+        with self.lock:
+            skipping = dict(self.conn.execute("SELECT ticker, kind FROM failures WHERE skip_until > ?", (now,)))
+        return [ticker for ticker in tickers if ticker not in skipping], \
+            {ticker: skipping[ticker] for ticker in tickers if ticker in skipping}
+
+    def summary(self, tickers):
+        # {ticker: kind} for the given tickers whose latest fetch failed, in watchlist order
+        with self.lock:
+            failing = dict(self.conn.execute("SELECT ticker, kind FROM failures"))
+        return {ticker: failing[ticker] for ticker in tickers if ticker in failing}
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failed chunks and rejects requests for
+    # `cooldown` seconds, so a run fails fast instead of timing out chunk by
+    # chunk. After the cooldown requests go through again; one more failure
+    # re-opens it, one success closes it.
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def check(self):
+        with self.lock:
+            if self.opened_at is None or time.time() - self.opened_at >= self.cooldown:
+                return
+            remaining = self.cooldown - (time.time() - self.opened_at)
+        raise SourceUnavailable(f"Data source failing, circuit open for another {remaining:.0f}s")
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.time()
@@ -0,0 +1,275 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from metrics import metrics
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+MA_WINDOWS = (5, 10, 20, 30, 60, 120, 250, 500, 1000)
+EMA_SPANS = (4, 8, 12, 21, 50)
+
+
+class Panel:
+    # Whole watchlist as 2-D arrays of shape (bars, tickers). Each ticker's
+    # bars are right-aligned so row -1 is every ticker's latest bar, and the
+    # rows before a ticker's first bar are NaN padding. Indicators therefore
+    # see exactly the bars they would see on the ticker's own DataFrame.
+    def __init__(self, tickers, dates, fields):
+        self.tickers = tickers
+        self.dates = dates
+        self.fields = fields
+        self.present = ~np.isnat(dates)
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def from_frames(cls, frames, length=None, min_length=0):
+        frames = {ticker: frame for ticker, frame in frames.items() if frame is not None and not frame.empty}
+        tickers = list(frames)
+        rows = max((len(frame) for frame in frames.values()), default=0)
+        if length is not None:
+            rows = min(rows, length)
+        rows = max(rows, min_length)
+
+        dates = np.full((rows, len(tickers)), np.datetime64('NaT'), dtype='datetime64[ns]')
+        fields = {field: np.full((rows, len(tickers)), np.nan) for field in FIELDS}
+        for i, ticker in enumerate(tickers):
+            frame = frames[ticker].iloc[-rows:] if rows else frames[ticker].iloc[:0]
+            n = len(frame)
+            if n == 0:
+                continue
+            dates[rows - n:, i] = frame.index.values.astype('datetime64[ns]')
+            for field in FIELDS:
+                if field in frame:
+                    fields[field][rows - n:, i] = frame[field].to_numpy(dtype=float)
+        return cls(tickers, dates, fields)
+
+
+def shift(values, periods=1):
+    out = np.full(values.shape, np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def prefix_sums(values):
+    # Cumulative sums of the non-NaN values and of how many there are, with a
+    # leading zero row, so any window's sum is one subtraction. Sums are taken
+    # on values centred per column to keep the cumulative sum's rounding error
+    # far below the price scale.
+    valid = ~np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        offset = np.where(valid.any(axis=0), np.nanmean(np.where(valid, values, np.nan), axis=0), 0.0)
+    centred = np.where(valid, values - offset, 0.0)
+    zeros = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([zeros, np.cumsum(centred, axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    return sums, counts, offset
+
+
+def window_sums(prefix, window):
+    # Windowed sums and counts ending at every row, from prefix_sums()
+    sums, counts, offset = prefix
+    lag = np.maximum(np.arange(1, len(sums)) - window, 0)
+    window_sum = sums[1:] - sums[lag]
+    window_count = counts[1:] - counts[lag]
+    return window_sum + offset * window_count, window_count
+
+
+def rolling_sum_count(values, window):
+    # Windowed sums of the non-NaN values and of how many there are
+    return window_sums(prefix_sums(values), window)
+
+
+def rolling_mean(values, window, min_periods=None, prefix=None):
+    # Same as pandas .rolling(window, min_periods).mean() per column; pass
+    # prefix=prefix_sums(values) to reuse the cumulative sums across windows
+    min_periods = window if min_periods is None else min_periods
+    window_sum, window_count = window_sums(prefix if prefix is not None else prefix_sums(values), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = window_sum / window_count
+    return np.where(window_count >= max(min_periods, 1), mean, np.nan)
+
+
+def _rolling_extreme(values, window, min_periods, reduce, fill):
+    padded = np.concatenate([np.full((window - 1,) + values.shape[1:], np.nan), values])
+    filled = np.where(np.isnan(padded), fill, padded)
+    extreme = reduce(sliding_window_view(filled, window, axis=0), axis=-1)
+    counts = sliding_window_view(~np.isnan(padded), window, axis=0).sum(axis=-1)
+    return np.where(counts >= max(min_periods, 1), extreme, np.nan)
+
+
+def rolling_min(values, window, min_periods=None):
+    min_periods = window if min_periods is None else min_periods
+    return _rolling_extreme(values, window, min_periods, np.min, np.inf)
+
+
+def rolling_max(values, window, min_periods=None):
+    min_periods = window if min_periods is None else min_periods
+    return _rolling_extreme(values, window, min_periods, np.max, -np.inf)
+
+
+def ewm_mean(values, alpha, adjust=True, min_periods=0):
+    # Port of pandas' ewm mean (ignore_na=False) applied to every column at once
+    out = np.full(values.shape, np.nan)
+    weighted = np.full(values.shape[1:], np.nan)
+    old_wt = np.ones(values.shape[1:])
+    nobs = np.zeros(values.shape[1:], dtype=int)
+    new_wt = 1.0 if adjust else alpha
+    factor = 1.0 - alpha
+    min_periods = max(min_periods, 1)
+
+    for t in range(len(values)):
+        cur = values[t]
+        observed = ~np.isnan(cur)
+        started = ~np.isnan(weighted)
+        nobs += observed
+        old_wt = np.where(started, old_wt * factor, old_wt)
+        update = started & observed & (weighted != cur)
+        blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(update, blended, weighted)
+        if adjust:
+            old_wt = np.where(started & observed, old_wt + new_wt, old_wt)
+        else:
+            old_wt = np.where(started & observed, 1.0, old_wt)
+        weighted = np.where(~started & observed, cur, weighted)
+        out[t] = np.where(nobs >= min_periods, weighted, np.nan)
+    return out
+
+
+def ema(values, span):
+    # pandas .ewm(span=span, adjust=False).mean()
+    return ewm_mean(values, 2.0 / (span + 1), adjust=False)
+
+
+def kdj(high, low, close, n=9, k_period=3, d_period=3):
+    low_min = rolling_min(low, n, min_periods=1)
+    high_max = rolling_max(high, n, min_periods=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsv = (close - low_min) / (high_max - low_min) * 100
+
+    k = ewm_mean(rsv, 1.0 / k_period, min_periods=1)
+    d = ewm_mean(k, 1.0 / d_period, min_periods=1)
+    j = 3 * k - 2 * d
+    return k, d, j
+
+
+def macd(close, short_window=12, long_window=26, signal_window=9):
+    ema_short = ema(close, short_window)
+    ema_long = ema(close, long_window)
+    dif = ema_short - ema_long
+    dea = ema(dif, signal_window)
+    return ema_short, ema_long, dif, dea, 2 * (dif - dea)
+
+
+def rsi(close, period=14, present=None):
+    delta = close - shift(close)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    if present is not None:
+        # Padding rows are not bars; pandas would never have seen them
+        gain = np.where(present, gain, np.nan)
+        loss = np.where(present, loss, np.nan)
+    avg_gain = rolling_mean(gain, period)
+    avg_loss = rolling_mean(loss, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+class Indicator:
+    def __init__(self, outputs, inputs, compute):
+        self.outputs = outputs
+        self.inputs = inputs
+        self.compute = compute
+
+
+INDICATORS = {}
+
+
+def register_indicator(outputs, inputs):
+    def decorator(compute):
+        node = Indicator(outputs, inputs, compute)
+        for output in outputs:
+            INDICATORS[output] = node
+        return compute
+    return decorator
+
+
+@register_indicator(('K', 'D', 'J'), ('High', 'Low', 'Close'))
+def _kdj(values, panel):
+    return dict(zip(('K', 'D', 'J'), kdj(values['High'], values['Low'], values['Close'])))
+
+
+@register_indicator(('DIF',), ('EMA12', 'EMA26'))
+def _dif(values, panel):
+    return {'DIF': values['EMA12'] - values['EMA26']}
+
+
+@register_indicator(('DEA',), ('DIF',))
+def _dea(values, panel):
+    return {'DEA': ema(values['DIF'], 9)}
+
+
+@register_indicator(('MACD',), ('DIF', 'DEA'))
+def _macd(values, panel):
+    return {'MACD': 2 * (values['DIF'] - values['DEA'])}
+
+
+@register_indicator(('RSI',), ('Close',))
+def _rsi(values, panel):
+    return {'RSI': rsi(values['Close'], present=panel.present)}
+
+
+def get_indicator(name):
+    # MA<n> and EMA<n> exist for any window, everything else is registered
+    if name in INDICATORS:
+        return INDICATORS[name]
+    for prefix, func in (('EMA', ema), ('MA', rolling_mean)):
+        window = name[len(prefix):]
+        if name.startswith(prefix) and window.isdigit() and int(window) > 0:
+            return Indicator((name,), ('Close',), lambda values, panel, w=int(window), f=func: {name: f(values['Close'], w)})
+    raise KeyError(f"Unknown indicator: {name}")
+
+
+DEFAULT_INDICATORS = (
+    [f'MA{window}' for window in MA_WINDOWS] + [f'EMA{span}' for span in EMA_SPANS]
+    + ['K', 'D', 'J', 'EMA26', 'DIF', 'DEA', 'MACD', 'RSI']
+)
+
+
+def dependency_order(names):
+    # Indicator nodes needed for names, each listed after the nodes it reads from
+    order = []
+    done = set(FIELDS)
+
+    def visit(name, visiting):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Circular indicator dependency at {name}")
+        visiting.add(name)
+        node = get_indicator(name)
+        for dependency in node.inputs:
+            visit(dependency, visiting)
+        visiting.discard(name)
+        order.append(node)
+        done.update(node.outputs)
+
+    for name in names:
+        visit(name, set())
+    return order
+
+
+class IndicatorEngine:
+    def compute(self, panel, names=None):
+        # Compute the requested indicators plus whatever they depend on, and nothing else
+        names = DEFAULT_INDICATORS if names is None else names
+        values = dict(panel.fields)
+        with metrics.timer('indicators', mode='panel'):
+            for node in dependency_order(names):
+                values.update(node.compute({key: values[key] for key in node.inputs}, panel))
+        return values
@@ -0,0 +1,336 @@
+import copy
+import math
+import os
+import pickle
+from array import array
+from collections import deque
+
+import numpy as np
+
+from indicator_engine import FIELDS, dependency_order
+from metrics import metrics
+from signals import evaluate_tail, max_lookback, required_indicators
+
+STATE_FILE = 'indicator_state.pkl'
+STATE_VERSION = 3  # Bump when TickerState's layout changes; older pickled states are rebuilt
+NAN = float('nan')
+
+
+def _div(a, b):
+    # Float division with NumPy semantics (x/0 -> inf, 0/0 -> nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class RingBuffer:
+    # Fixed-capacity ring over one preallocated, contiguous float64 array.
+    # Rows of `width` values; appending overwrites the oldest row once full.
+    # array.array rather than NumPy: scalar reads and writes stay cheap in the
+    # per-bar update loop, and np.frombuffer still gives a zero-copy view.
+    def __init__(self, capacity, width=1):
+        self.capacity = capacity
+        self.width = width
+        self.data = array('d', [NAN]) * (capacity * width)
+        self.head = 0  # Row the next append writes
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, x):
+        # Single-value rows only; returns the value pushed out (NaN while not full)
+        old = self.data[self.head]
+        self.data[self.head] = x
+        self.head = self.head + 1 if self.head + 1 < self.capacity else 0
+        if self.size < self.capacity:
+            self.size += 1
+        return old
+
+    def append_row(self, values):
+        start = self.head * self.width
+        self.data[start:start + self.width] = array('d', values)
+        self.head = self.head + 1 if self.head + 1 < self.capacity else 0
+        if self.size < self.capacity:
+            self.size += 1
+
+    def to_array(self):
+        # The stored rows oldest first, shape (size, width)
+        rows = np.frombuffer(self.data, dtype=np.float64).reshape(self.capacity, self.width)
+        if self.size < self.capacity:
+            return rows[:self.size].copy()
+        return np.concatenate([rows[self.head:], rows[:self.head]])
+
+
+class EWMState:
+    # Scalar form of the pandas ewm recursion used by indicator_engine.ewm_mean
+    def __init__(self, alpha, adjust=True, min_periods=1):
+        self.new_wt = 1.0 if adjust else alpha
+        self.factor = 1.0 - alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        observed = not math.isnan(x)
+        self.nobs += observed
+        if not math.isnan(self.weighted):
+            self.old_wt *= self.factor
+            if observed:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * x) / (self.old_wt + self.new_wt)
+                self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        elif observed:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+class RollingMeanState:
+    # Running window sum; re-summed once per window to keep rounding from drifting
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = max(window if min_periods is None else min_periods, 1)
+        self.values = RingBuffer(window)
+        self.total = 0.0
+        self.count = 0
+        self.updates = 0
+
+    def update(self, x):
+        old = self.values.append(x)
+        if not math.isnan(old):
+            self.total -= old
+            self.count -= 1
+        if not math.isnan(x):
+            self.total += x
+            self.count += 1
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self.total = math.fsum(v for v in self.values.data if not math.isnan(v))
+        return self.total / self.count if self.count >= self.min_periods else NAN
+
+
+class RollingExtremeState:
+    # Monotonic deque giving the window min (or max) in amortized O(1)
+    def __init__(self, window, lowest, min_periods=1):
+        self.window = window
+        self.lowest = lowest
+        self.min_periods = max(min_periods, 1)
+        self.candidates = deque()
+        self.valid = RingBuffer(window)
+        self.valid_count = 0
+        self.index = 0
+
+    def update(self, x):
+        self.index += 1
+        if not math.isnan(x):
+            while self.candidates and (self.candidates[-1][1] >= x if self.lowest else self.candidates[-1][1] <= x):
+                self.candidates.pop()
+            self.candidates.append((self.index, x))
+        while self.candidates and self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+        observed = 0.0 if math.isnan(x) else 1.0
+        old = self.valid.append(observed)
+        self.valid_count += observed - (0.0 if math.isnan(old) else old)
+        if self.valid_count < self.min_periods or not self.candidates:
+            return NAN
+        return self.candidates[0][1]
+
+
+class MAUpdater:
+    def __init__(self, name, window):
+        self.name = name
+        self.state = RollingMeanState(window)
+
+    def update(self, values):
+        return {self.name: self.state.update(values['Close'])}
+
+
+class EMAUpdater:
+    def __init__(self, name, span):
+        self.name = name
+        self.state = EWMState(2.0 / (span + 1), adjust=False)
+
+    def update(self, values):
+        return {self.name: self.state.update(values['Close'])}
+
+
+class KDJUpdater:
+    def __init__(self, n=9, k_period=3, d_period=3):
+        self.low_min = RollingExtremeState(n, lowest=True)
+        self.high_max = RollingExtremeState(n, lowest=False)
+        self.k = EWMState(1.0 / k_period)
+        self.d = EWMState(1.0 / d_period)
+
+    def update(self, values):
+        low_min = self.low_min.update(values['Low'])
+        high_max = self.high_max.update(values['High'])
+        rsv = _div(values['Close'] - low_min, high_max - low_min) * 100
+        k = self.k.update(rsv)
+        d = self.d.update(k)
+        return {'K': k, 'D': d, 'J': 3 * k - 2 * d}
+
+
+class DIFUpdater:
+    def update(self, values):
+        return {'DIF': values['EMA12'] - values['EMA26']}
+
+
+class DEAUpdater:
+    def __init__(self, signal_window=9):
+        self.state = EWMState(2.0 / (signal_window + 1), adjust=False)
+
+    def update(self, values):
+        return {'DEA': self.state.update(values['DIF'])}
+
+
+class MACDUpdater:
+    def update(self, values):
+        return {'MACD': 2 * (values['DIF'] - values['DEA'])}
+
+
+class RSIUpdater:
+    def __init__(self, period=14):
+        self.prev_close = NAN
+        self.gain = RollingMeanState(period)
+        self.loss = RollingMeanState(period)
+
+    def update(self, values):
+        delta = values['Close'] - self.prev_close
+        self.prev_close = values['Close']
+        avg_gain = self.gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self.loss.update(-delta if delta < 0 else 0.0)
+        return {'RSI': 100 - _div(100, 1 + _div(avg_gain, avg_loss))}
+
+
+def make_updater(node):
+    name = node.outputs[0]
+    if name == 'K':
+        return KDJUpdater()
+    if name == 'DIF':
+        return DIFUpdater()
+    if name == 'DEA':
+        return DEAUpdater()
+    if name == 'MACD':
+        return MACDUpdater()
+    if name == 'RSI':
+        return RSIUpdater()
+    if name.startswith('EMA'):
+        return EMAUpdater(name, int(name[3:]))
+    if name.startswith('MA'):
+        return MAUpdater(name, int(name[2:]))
+    raise KeyError(f"No incremental form for indicator {name}")
+
+
+class TickerState:
+    # Running indicator state for one ticker plus the last few bars of values
+    # the signals look back on. Each new bar costs O(1) per indicator, and the
+    # whole state lives in a few fixed-size arrays: the rows ring holds exactly
+    # lookback + 1 bars and each rolling window holds exactly its window.
+    def __init__(self, names, lookback):
+        self.version = STATE_VERSION
+        self.names = list(names)
+        self.lookback = lookback
+        nodes = dependency_order(self.names)
+        self.columns = list(FIELDS) + [name for node in nodes for name in node.outputs]
+        self.rows = RingBuffer(lookback + 1, len(self.columns))
+        self.last_date = None
+        self.last_bar = None
+        self.updaters = [make_updater(node) for node in nodes]
+
+    def update(self, date, bar):
+        values = {field: float(bar.get(field, NAN)) for field in FIELDS}
+        for updater in self.updaters:
+            values.update(updater.update(values))
+        self.rows.append_row([values[column] for column in self.columns])
+        self.last_date = date
+        self.last_bar = (values['Open'], values['High'], values['Low'], values['Close'])
+        return values
+
+    def peek(self, date, bar):
+        # Copy of the state advanced by a provisional bar; this state stays at the last closed one
+        state = copy.deepcopy(self)
+        state.update(date, bar)
+        return state
+
+    def covers(self, names, lookback):
+        return set(names) <= set(self.names) and lookback <= self.lookback
+
+    def consistent_with(self, frame):
+        # False when the bar this state last consumed has been revised or is gone
+        if self.last_date is None or self.last_date not in frame.index:
+            return False
+        row = frame.loc[self.last_date]
+        current = tuple(float(row.get(field, NAN)) for field in ('Open', 'High', 'Low', 'Close'))
+        return all(math.isclose(a, b, rel_tol=1e-9) or (math.isnan(a) and math.isnan(b))
+                   for a, b in zip(current, self.last_bar))
+
+
+def build_state(frame, names, lookback):
+    state = TickerState(names, lookback)
+    for date, bar in zip(frame.index, frame.to_dict('records')):
+        state.update(date, bar)
+    return state
+
+
+class IndicatorStateStore:
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.states = {}
+        self.rebuilds = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as file:
+                    self.states = pickle.load(file)
+                # States pickled in an older layout are dropped and rebuilt on first use
+                self.states = {ticker: state for ticker, state in self.states.items()
+                               if getattr(state, 'version', None) == STATE_VERSION}
+            except Exception as e:
+                print(f"Error loading indicator state from {path}: {e}... starting fresh")
+
+    def advance(self, ticker, frame, names, lookback):
+        with metrics.timer('indicators', tickers=[ticker], mode='incremental'):
+            return self._advance(ticker, frame, names, lookback)
+
+    def _advance(self, ticker, frame, names, lookback):
+        # Bring the ticker's state up to the frame's last bar: apply only the bars
+        # after the one it last saw, or rebuild if that bar was revised
+        state = self.states.get(ticker)
+        if state is None or not state.covers(names, lookback) or not state.consistent_with(frame):
+            wanted = list(names) if state is None else list(dict.fromkeys(state.names + list(names)))
+            state = build_state(frame, wanted, max(lookback, state.lookback if state else 0))
+            self.states[ticker] = state
+            self.rebuilds += 1
+            metrics.increment('state_rebuilds')
+            return state
+
+        for date, bar in zip(frame.index, frame.to_dict('records')):
+            if date > state.last_date:
+                state.update(date, bar)
+        return state
+
+    def evict(self, tickers):
+        for ticker in tickers:
+            self.states.pop(ticker, None)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(self.states, file)
+        os.replace(tmp_path, self.path)
+
+
+def evaluate_states(states, names):
+    # Evaluate signals from the rows kept in each TickerState, one column per ticker
+    lookback = max_lookback(names)
+    keys = list(FIELDS) + required_indicators(names)
+    tail = {key: np.full((lookback + 1, len(states)), np.nan) for key in keys}
+    for i, state in enumerate(states):
+        rows = state.rows.to_array()[-(lookback + 1):]
+        offset = lookback + 1 - len(rows)
+        for key in keys:
+            if key in state.columns:
+                tail[key][offset:, i] = rows[:, state.columns.index(key)]
+    return evaluate_tail(tail, names)
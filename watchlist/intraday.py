@@ -0,0 +1,121 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from analyzer import DAILY_PERIOD
+from data_fetcher import DataFetcher
+from indicator_state import IndicatorStateStore, evaluate_states
+from metrics import metrics
+from signals import max_lookback, required_indicators
+
+INTRADAY_SIGNALS = ['one_cross_three', 'macd_golden_cross', 'macd_death_cross', 'e4e12_golden_cross',
+                    'e4e12_death_cross', 'e4e50_golden_cross', 'e4e50_death_cross', 'rsi20_oversold']
+CONFIRM_POLLS = 2  # Consecutive polls a signal has to hold its new state before it is alerted
+COOLDOWN = 30 * 60  # Seconds before the same ticker and signal may fire another alert
+
+
+def daily_bar(minutes, session):
+    # Provisional daily bar from the session's minute bars so far; plain NumPy,
+    # since this runs for every ticker on every poll
+    rows = (minutes.index.values >= session.to_datetime64()) & ~np.isnan(minutes['Close'].to_numpy(dtype=float))
+    if not rows.any():
+        return None
+    column = {field: minutes[field].to_numpy(dtype=float)[rows] for field in ('Open', 'High', 'Low', 'Close', 'Volume')}
+    return {'Open': column['Open'][0], 'High': np.nanmax(column['High']), 'Low': np.nanmin(column['Low']),
+            'Close': column['Close'][-1], 'Volume': np.nansum(column['Volume'])}
+
+
+class AlertDebouncer:
+    # Turns raw per-poll signal values into alerts. A signal only changes state
+    # after holding the new value for `confirm` polls, and a ticker/signal pair
+    # that fired recently stays quiet for `cooldown` seconds, so a cross
+    # flapping around the line does not spam the channel.
+    def __init__(self, confirm=CONFIRM_POLLS, cooldown=COOLDOWN):
+        self.confirm = confirm
+        self.cooldown = cooldown
+        self.state = {}  # (ticker, signal) -> confirmed value
+        self.pending = {}  # (ticker, signal) -> polls the opposite value has held
+        self.fired_at = {}
+
+    def update(self, results, now=None):
+        # results: {ticker: {signal: bool}}; returns [(ticker, signal, fired)] for confirmed changes
+        now = now or time.time()
+        alerts = []
+        for ticker, result in results.items():
+            for name, value in result.items():
+                key = (ticker, name)
+                if value == self.state.get(key, False):
+                    self.pending.pop(key, None)
+                    continue
+                self.pending[key] = self.pending.get(key, 0) + 1
+                if self.pending[key] < self.confirm:
+                    continue
+                del self.pending[key]
+                self.state[key] = value
+                if value and now - self.fired_at.get(key, float('-inf')) < self.cooldown:
+                    continue
+                if value:
+                    self.fired_at[key] = now
+                    alerts.append((ticker, name, True))
+                elif key in self.fired_at:
+                    # Only report a clear for something the channel was told about
+                    alerts.append((ticker, name, False))
+        return alerts
+
+
+class IntradayMonitor:
+    # Evaluates the crossover signals on the session's provisional daily bar.
+    # Indicator state is built once per session from the closed daily bars;
+    # every poll only downloads today's minute bars and peeks each state one
+    # bar ahead, which costs O(1) per indicator and ticker.
+    def __init__(self, pipeline=None, fetcher=None, names=INTRADAY_SIGNALS, debouncer=None, poll_pipeline=None):
+        # poll_pipeline: fetches the minute bars, e.g. with its own request budget so
+        # polls keep their cadence; defaults to pipeline
+        self.pipeline = pipeline
+        self.poll_pipeline = poll_pipeline or pipeline
+        self.fetcher = pipeline.fetcher if pipeline else fetcher or DataFetcher()
+        self.names = list(names)
+        self.indicators = required_indicators(self.names)
+        self.lookback = max_lookback(self.names)
+        self.debouncer = debouncer or AlertDebouncer()
+        self.states = IndicatorStateStore(path=None)
+        self.session = None
+
+    def fetch(self, tickers, pipeline=None, **fetch_kwargs):
+        pipeline = pipeline or self.pipeline
+        if pipeline is not None:
+            for frames in pipeline.fetch(tickers, **fetch_kwargs):
+                yield from frames.items()
+            return
+        yield from self.fetcher.download(tickers, **fetch_kwargs).items()
+
+    def start_session(self, tickers, session):
+        # Advance every ticker's state through the last closed bar before session
+        session = pd.Timestamp(session)
+        self.session = session
+        self.debouncer = AlertDebouncer(self.debouncer.confirm, self.debouncer.cooldown)
+        for ticker, frame in self.fetch(tickers, period=DAILY_PERIOD, interval='1d', end=session):
+            if frame is None:
+                continue
+            frame = frame[frame.index < session]
+            if not frame.empty:
+                self.states.advance(ticker, frame, self.indicators, self.lookback)
+
+    def poll(self, tickers):
+        # [(ticker, signal, fired)] for signals whose confirmed state changed since the last poll
+        with metrics.timer('intraday', tickers=tickers):
+            states = []
+            evaluated = []
+            for ticker, minutes in self.fetch(tickers, self.poll_pipeline, period='1d', interval='1m'):
+                base = self.states.states.get(ticker)
+                bar = None if minutes is None else daily_bar(minutes, self.session)
+                if base is None or bar is None:
+                    continue
+                states.append(base.peek(self.session, bar))
+                evaluated.append(ticker)
+            signals = evaluate_states(states, self.names)
+        results = {ticker: {name: bool(values[i]) for name, values in signals.items()}
+                   for i, ticker in enumerate(evaluated)}
+        return self.debouncer.update(results)
+
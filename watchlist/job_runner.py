@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+MAX_SLEEP = 300  # Re-check the clock at least this often (seconds), in case of suspend or clock changes
+
+
+class Job:
+    def __init__(self, name, weekdays, at, callback, tz):
+        self.name = name
+        self.weekdays = {WEEKDAYS.index(day) for day in weekdays}
+        self.hour, self.minute = (int(part) for part in at.split(':'))
+        self.callback = callback
+        self.tz = ZoneInfo(tz)
+        self.next_run = None
+        self.announce = True
+
+    def schedule_after(self, now):
+        now = now.astimezone(self.tz)
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        while candidate.weekday() not in self.weekdays:
+            candidate += timedelta(days=1)
+        self.next_run = candidate
+        return candidate
+
+
+class IntervalJob:
+    # Same interface as Job, due every `seconds` instead of at a time of day
+    def __init__(self, name, seconds, callback):
+        self.name = name
+        self.seconds = seconds
+        self.callback = callback
+        self.next_run = None
+        self.announce = False  # Frequent housekeeping, not worth a log line every time
+
+    def schedule_after(self, now):
+        self.next_run = now + timedelta(seconds=self.seconds)
+        return self.next_run
+
+
+class JobRunner:
+    # Timer-based replacement for polling schedule.run_pending() every second:
+    # sleeps until the next job is due and starts it as its own task so a long
+    # job never delays the others. start() is idempotent across reconnects.
+    def __init__(self):
+        self.jobs = []
+        self.task = None
+        self.running = set()
+
+    def every(self, weekdays, at, name, callback, tz='America/New_York'):
+        # callback is a coroutine function taking no arguments
+        self.jobs.append(Job(name, weekdays, at, callback, tz))
+
+    def every_seconds(self, seconds, name, callback):
+        self.jobs.append(IntervalJob(name, seconds, callback))
+
+    def start(self):
+        if self.task is not None and not self.task.done():
+            return False
+        self.task = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+    async def _run(self):
+        now = datetime.now(ZoneInfo('UTC'))
+        for job in self.jobs:
+            job.schedule_after(now)
+        while self.jobs:
+            now = datetime.now(ZoneInfo('UTC'))
+            due = [job for job in self.jobs if job.next_run <= now]
+            for job in due:
+                if job.announce:
+                    print(f"Starting scheduled job {job.name}")
+                self._start(job.callback)
+                job.schedule_after(now)
+            next_run = min(job.next_run for job in self.jobs)
+            await asyncio.sleep(min(max((next_run - now).total_seconds(), 0), MAX_SLEEP))
+
+    def run_now(self, name, callback):
+        # Start a job outside its schedule, e.g. to catch up on a run missed while the bot was down
+        print(f"Starting job {name}")
+        self._start(callback)
+
+    def _start(self, callback):
+        task = asyncio.create_task(callback())
+        self.running.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        self.running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Scheduled job failed: {task.exception()}")
+
+
+class RunStatus:
+    # Progress and cancellation flag shared between the event loop and a worker thread
+    def __init__(self, name):
+        self.name = name
+        self.done = 0
+        self.total = 0
+        self.started = time.time()
+        self.cancel_event = threading.Event()
+
+    def update(self, done, total):
+        self.done = done
+        self.total = total
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def describe(self):
+        elapsed = time.time() - self.started
+        return f"{self.name}: {self.done}/{self.total} tickers, {elapsed:.0f}s elapsed"
@@ -0,0 +1,104 @@
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+LIDAO_FILE = 'lidao.db'
+LIDAO_COLUMNS = ['Lidao-1.0', 'Lidao-SPX', 'Lidao-NASDAQ']
+
+
+def parse_reading(value):
+    # Readings pasted from chat sometimes carry stray characters around the number
+    if isinstance(value, str):
+        value = re.sub(r'[^\d.-]', '', value)
+    return None if pd.isna(value) or value == '' else float(value)
+
+
+class LidaoStore:
+    # Daily Lidao readings keyed by date. An upsert touches one B-tree row, so
+    # recording a reading costs the same however much history has piled up.
+    def __init__(self, db_path=LIDAO_FILE, csv_path=None):
+        # csv_path: CSV of readings upserted into the store whenever the file changes
+        self.csv_path = csv_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS readings (
+                    date TEXT PRIMARY KEY,
+                    lidao_1 REAL, lidao_spx REAL, lidao_nasdaq REAL
+                ) WITHOUT ROWID
+            """)
+            # (mtime_ns, size) of the CSV version last imported
+            self.conn.execute("CREATE TABLE IF NOT EXISTS csv_imports (path TEXT PRIMARY KEY, signature TEXT)")
+        self.sync_csv()
+
+    def sync_csv(self):
+        # Import the CSV again if it changed since the last import; rows appended to
+        # it, e.g. by hand for the standalone chart script, would otherwise be ignored
+        if not self.csv_path or not os.path.exists(self.csv_path):
+            return
+        stat = os.stat(self.csv_path)
+        signature = f"{stat.st_mtime_ns}:{stat.st_size}"
+        path = os.path.abspath(self.csv_path)
+        with self.lock:
+            row = self.conn.execute("SELECT signature FROM csv_imports WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == signature:
+            return
+        imported = self.import_csv(self.csv_path)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO csv_imports VALUES (?, ?)", (path, signature))
+        print(f"Imported {imported} Lidao readings from {self.csv_path}")
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+    def import_csv(self, csv_path):
+        data = pd.read_csv(csv_path, parse_dates=['Date'])
+        # A date entered twice keeps its later row, as the CSV upsert did
+        readings = {
+            pd.Timestamp(date).strftime('%Y-%m-%d'): [parse_reading(value) for value in values]
+            for date, values in zip(data['Date'], data[LIDAO_COLUMNS].itertuples(index=False, name=None))
+        }
+        rows = [(date, *values) for date, values in readings.items()]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def upsert(self, date, lidao_1, lidao_spx, lidao_nasdaq):
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO readings VALUES (?, ?, ?, ?)
+                ON CONFLICT (date) DO UPDATE SET
+                    lidao_1 = excluded.lidao_1,
+                    lidao_spx = excluded.lidao_spx,
+                    lidao_nasdaq = excluded.lidao_nasdaq
+            """, (pd.Timestamp(date).strftime('%Y-%m-%d'), lidao_1, lidao_spx, lidao_nasdaq))
+
+    def load(self, start=None, end=None):
+        # Readings in [start, end) as a frame indexed by Date, oldest first
+        self.sync_csv()
+        query = "SELECT date, lidao_1, lidao_spx, lidao_nasdaq FROM readings"
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            clauses.append("date < ?")
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY date"
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return pd.DataFrame([row[1:] for row in rows], columns=LIDAO_COLUMNS,
+                            index=pd.DatetimeIndex([row[0] for row in rows], name='Date'), dtype=float)
+
+    def first_date(self):
+        with self.lock:
+            row = self.conn.execute("SELECT MIN(date) FROM readings").fetchone()
+        return None if row[0] is None else pd.Timestamp(row[0])
@@ -0,0 +1,111 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo('America/New_York')
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)  # Day before Independence Day, day after Thanksgiving, Christmas Eve
+JUNETEENTH_FROM = 2022  # First year NYSE closed for Juneteenth
+
+
+def easter(year):
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+def nth_weekday(year, month, weekday, n):
+    # n-th given weekday of a month; n = -1 is the last one
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def observed(day):
+    # Saturday holidays are observed on Friday, Sunday ones on Monday
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    days = {
+        nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        easter(year) - timedelta(days=2),  # Good Friday
+        nth_weekday(year, 5, 0, -1),  # Memorial Day
+        observed(date(year, 7, 4)),
+        nth_weekday(year, 9, 0, 1),  # Labor Day
+        nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        observed(date(year, 12, 25)),
+    }
+    # New Year's Day on a Saturday is not made up on the previous Friday
+    if date(year, 1, 1).weekday() != 5:
+        days.add(observed(date(year, 1, 1)))
+    if year >= JUNETEENTH_FROM:
+        days.add(observed(date(year, 6, 19)))
+    return frozenset(days)
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    days = {nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 7, 3), date(year, 12, 24)}
+    return frozenset(day for day in days if day.weekday() < 5 and day not in holidays(year))
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session_close(day):
+    # Closing time of the session on day, in New York time
+    close = EARLY_CLOSE if day in early_closes(day.year) else REGULAR_CLOSE
+    return datetime.combine(day, close, MARKET_TZ)
+
+
+def is_market_open(now=None):
+    # True during a regular session, early closes included
+    now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+    day = now.date()
+    return is_trading_day(day) and datetime.combine(day, REGULAR_OPEN, MARKET_TZ) <= now < session_close(day)
+
+
+def previous_trading_day(day):
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def last_trading_day_of_week(day):
+    # True if day is a session and no other one follows it before the weekend
+    if not is_trading_day(day):
+        return False
+    following = day + timedelta(days=1)
+    while following.weekday() < 5:
+        if is_trading_day(following):
+            return False
+        following += timedelta(days=1)
+    return True
+
+
+def last_close(now=None):
+    # Most recent session close at or before now, as an aware datetime
+    now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+    day = now.date()
+    if not is_trading_day(day) or session_close(day) > now:
+        day = previous_trading_day(day)
+    return session_close(day)
@@ -0,0 +1,154 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120)  # Seconds, upper bounds of the stage histograms
+SLOW_TICKER_SECONDS = 2.0  # Per-ticker time in one stage above which the ticker is logged as slow
+SLOW_LOG_SIZE = 200
+PREFIX = 'watchlist'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class Metrics:
+    # Stage timings (histograms), counters and a slow-ticker log shared by the
+    # fetch, compute and delivery code. Worker processes collect into their own
+    # copy; the pipeline drains it after each task and merges it here.
+    def __init__(self, slow_seconds=SLOW_TICKER_SECONDS):
+        self.slow_seconds = slow_seconds
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+            self.slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def observe(self, stage, seconds, **labels):
+        key = _key(stage, labels)
+        with self.lock:
+            timing = self.timings.setdefault(key, {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS)})
+            timing['count'] += 1
+            timing['sum'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    timing['buckets'][i] += 1
+
+    @contextmanager
+    def timer(self, stage, tickers=None, **labels):
+        # Time a block as one observation of stage; tickers, if given, share the
+        # time for the slow-ticker log
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self.observe(stage, seconds, **labels)
+            if tickers:
+                self.check_slow(stage, tickers, seconds)
+
+    def check_slow(self, stage, tickers, seconds):
+        per_ticker = seconds / len(tickers)
+        if per_ticker >= self.slow_seconds:
+            with self.lock:
+                self.slow.append({'time': time.time(), 'stage': stage, 'tickers': list(tickers),
+                                  'seconds': seconds, 'per_ticker': per_ticker})
+
+    def increment(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def drain(self):
+        # Everything collected so far, as plain data, and start over
+        with self.lock:
+            data = {'timings': list(self.timings.items()), 'counters': list(self.counters.items()),
+                    'slow': list(self.slow)}
+        self.reset()
+        return data
+
+    def merge(self, data):
+        with self.lock:
+            for key, other in data['timings']:
+                timing = self.timings.setdefault(key, {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS)})
+                timing['count'] += other['count']
+                timing['sum'] += other['sum']
+                timing['max'] = max(timing['max'], other['max'])
+                timing['buckets'] = [a + b for a, b in zip(timing['buckets'], other['buckets'])]
+            for key, value in data['counters']:
+                self.counters[key] = self.counters.get(key, 0) + value
+            self.slow.extend(data['slow'])
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'timings': [{'stage': name, 'labels': dict(labels), 'count': timing['count'], 'sum': timing['sum'],
+                             'max': timing['max']} for (name, labels), timing in sorted(self.timings.items())],
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                'slow_tickers': list(self.slow),
+            }
+
+    def prometheus(self):
+        # Prometheus text exposition format, e.g. for node_exporter's textfile collector
+        lines = [f'# TYPE {PREFIX}_stage_seconds histogram']
+        with self.lock:
+            for (name, labels), timing in sorted(self.timings.items()):
+                stage_labels = (('stage', name),) + labels
+                for bound, count in zip(BUCKETS, timing['buckets']):
+                    lines.append(f'{PREFIX}_stage_seconds_bucket{_format_labels(stage_labels, [("le", bound)])} {count}')
+                lines.append(f'{PREFIX}_stage_seconds_bucket{_format_labels(stage_labels, [("le", "+Inf")])} {timing["count"]}')
+                lines.append(f'{PREFIX}_stage_seconds_sum{_format_labels(stage_labels)} {timing["sum"]}')
+                lines.append(f'{PREFIX}_stage_seconds_count{_format_labels(stage_labels)} {timing["count"]}')
+            names = sorted({name for name, _ in self.counters})
+            for counter in names:
+                lines.append(f'# TYPE {PREFIX}_{counter}_total counter')
+                for (name, labels), value in sorted(self.counters.items()):
+                    if name == counter:
+                        lines.append(f'{PREFIX}_{name}_total{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, json_path=None, prom_path=None):
+        # Replace the files atomically so a scraper never reads half a write
+        for path, text in ((json_path, lambda: json.dumps(self.to_dict(), indent=2)), (prom_path, self.prometheus)):
+            if not path:
+                continue
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as file:
+                file.write(text())
+            os.replace(tmp_path, path)
+
+
+metrics = Metrics()
+
+
+def run_with_metrics(compute, *args):
+    # Process-pool entry point: run compute and ship this worker's metrics back with its result
+    metrics.drain()
+    result = compute(*args)
+    return result, metrics.drain()
+
+
+def profiled(func, path, *args, **kwargs):
+    # Run func once under cProfile and dump the stats to path for pstats/snakeviz
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
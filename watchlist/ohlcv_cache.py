@@ -0,0 +1,202 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from market_calendar import MARKET_TZ, is_market_open, last_close
+
+CACHE_FILE = 'ohlcv_cache.db'
+CACHEABLE_INTERVALS = ('1d', '1wk', '1mo', '3mo')
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+ADJUSTMENT_TOLERANCE = 1e-4  # Relative change in a settled close that means the history was re-adjusted
+
+
+def period_start(period, now=None):
+    # Translate a yfinance period string into the first date it covers
+    today = pd.Timestamp(now or datetime.now()).normalize()
+    if period is None or period == 'max':
+        return pd.Timestamp('1970-01-01')
+    if period == 'ytd':
+        return pd.Timestamp(year=today.year, month=1, day=1)
+    amount = int(''.join(ch for ch in period if ch.isdigit()))
+    unit = period.lstrip('0123456789')
+    if unit == 'd':
+        return today - pd.DateOffset(days=amount)
+    if unit == 'wk':
+        return today - pd.DateOffset(weeks=amount)
+    if unit == 'mo':
+        return today - pd.DateOffset(months=amount)
+    if unit == 'y':
+        return today - pd.DateOffset(years=amount)
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def last_session_close(now=None):
+    # Most recent session close at or before now, in epoch seconds; holidays and early closes included
+    return last_close(datetime.fromtimestamp(now or time.time(), MARKET_TZ)).timestamp()
+
+
+class OHLCVCache:
+    def __init__(self, db_path=CACHE_FILE, max_age=15 * 60, settle=30 * 60, grace_days=7):
+        # max_age: seconds a fetch stays fresh during the session
+        # settle: seconds after the close before the daily bar is treated as final
+        # grace_days: idle days before a ticker missing from every watchlist is evicted
+        self.max_age = max_age
+        self.settle = settle
+        self.grace_days = grace_days
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    ticker TEXT, interval TEXT, date TEXT,
+                    open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume REAL,
+                    PRIMARY KEY (ticker, interval, date)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    ticker TEXT, interval TEXT,
+                    covered_from TEXT, last_date TEXT,
+                    fetched_at REAL, last_used REAL,
+                    PRIMARY KEY (ticker, interval)
+                )
+            """)
+
+    def _meta(self, ticker, interval):
+        row = self.conn.execute(
+            "SELECT covered_from, last_date, fetched_at FROM meta WHERE ticker = ? AND interval = ?",
+            (ticker, interval)).fetchone()
+        return row
+
+    def is_fresh(self, fetched_at, now=None):
+        now = now or time.time()
+        if now - fetched_at < self.max_age:
+            return True
+        # While the market is closed nothing new is published after a settled close;
+        # during a session the bar is provisional and max_age applies
+        if is_market_open(datetime.fromtimestamp(now, MARKET_TZ)):
+            return False
+        return fetched_at >= last_session_close(now) + self.settle
+
+    def fetch_start(self, ticker, interval, start, now=None):
+        # Date a refresh has to download from, or None if the cached bars are current
+        with self.lock:
+            meta = self._meta(ticker, interval)
+        if meta is None or meta[1] is None:
+            return start
+        covered_from, last_date, fetched_at = meta
+        if start < pd.Timestamp(covered_from):
+            return start
+        if self.is_fresh(fetched_at, now):
+            return None
+        # Re-fetch the last cached bar, it may have been provisional, and the
+        # settled one before it, which adjusted() compares to spot a split or dividend
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MAX(date) FROM bars WHERE ticker = ? AND interval = ? AND date < ?",
+                (ticker, interval, last_date)).fetchone()
+        return pd.Timestamp(row[0] if row[0] else last_date)
+
+    def adjusted(self, ticker, interval, frame):
+        # True if the frame's bars disagree with the settled cached bars they overlap.
+        # yfinance adjusts every past price after a split or dividend, so the
+        # cached history no longer lines up with anything fetched since.
+        if frame is None or frame.empty:
+            return False
+        last_date = self.last_date(ticker, interval)
+        if last_date is None:
+            return False
+        cached = self.load(ticker, interval, frame.index.min(), last_date)
+        overlap = cached.index.intersection(frame.index)
+        for column in ('Close', 'Adj Close'):
+            if column in cached and column in frame:
+                old = cached.loc[overlap, column].to_numpy(dtype=float)
+                new = frame.loc[overlap, column].to_numpy(dtype=float)
+                if not np.allclose(old, new, rtol=ADJUSTMENT_TOLERANCE, equal_nan=True):
+                    return True
+        return False
+
+    def invalidate(self, ticker, interval):
+        # Drop the ticker's bars for interval; returns the date they covered from
+        with self.lock, self.conn:
+            meta = self._meta(ticker, interval)
+            self.conn.execute("DELETE FROM bars WHERE ticker = ? AND interval = ?", (ticker, interval))
+            self.conn.execute("DELETE FROM meta WHERE ticker = ? AND interval = ?", (ticker, interval))
+        return None if meta is None else pd.Timestamp(meta[0])
+
+    def last_date(self, ticker, interval):
+        with self.lock:
+            meta = self._meta(ticker, interval)
+        return None if meta is None or meta[1] is None else pd.Timestamp(meta[1])
+
+    def fetched_at(self, ticker, interval):
+        # Epoch seconds of the ticker's last refresh, None if it was never fetched
+        with self.lock:
+            meta = self._meta(ticker, interval)
+        return None if meta is None else meta[2]
+
+    def store(self, ticker, interval, frame, fetch_start, now=None):
+        if frame is None or frame.empty:
+            return
+        frame = frame.reindex(columns=COLUMNS)
+        rows = [
+            (ticker, interval, date.strftime('%Y-%m-%d'), *[None if pd.isna(v) else float(v) for v in values])
+            for date, values in zip(frame.index, frame.itertuples(index=False, name=None))
+        ]
+        last_date = frame.index.max().strftime('%Y-%m-%d')
+        fetch_start = pd.Timestamp(fetch_start).strftime('%Y-%m-%d')
+        now = now or time.time()
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("""
+                INSERT INTO meta VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ticker, interval) DO UPDATE SET
+                    covered_from = MIN(covered_from, excluded.covered_from),
+                    last_date = MAX(last_date, excluded.last_date),
+                    fetched_at = excluded.fetched_at
+            """, (ticker, interval, fetch_start, last_date, now, now))
+
+    def load(self, ticker, interval, start=None, end=None):
+        query = "SELECT date, open, high, low, close, adj_close, volume FROM bars WHERE ticker = ? AND interval = ?"
+        params = [ticker, interval]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            query += " AND date < ?"
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        query += " ORDER BY date"
+        with self.lock, self.conn:
+            rows = self.conn.execute(query, params).fetchall()
+            self.conn.execute("UPDATE meta SET last_used = ? WHERE ticker = ? AND interval = ?",
+                              (time.time(), ticker, interval))
+
+        frame = pd.DataFrame([row[1:] for row in rows], columns=COLUMNS,
+                             index=pd.DatetimeIndex([row[0] for row in rows], name='Date'))
+        return frame.dropna(axis=1, how='all')
+
+    def tickers(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT ticker FROM meta")]
+
+    def drop(self, tickers):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM bars WHERE ticker = ?", [(ticker,) for ticker in tickers])
+            self.conn.executemany("DELETE FROM meta WHERE ticker = ?", [(ticker,) for ticker in tickers])
+
+    def evict(self, keep_tickers, now=None):
+        # Drop tickers that left every watchlist and have not been read for grace_days
+        cutoff = (now or time.time()) - self.grace_days * 86400
+        keep = set(keep_tickers)
+        with self.lock:
+            idle = [row[0] for row in self.conn.execute(
+                "SELECT ticker FROM meta GROUP BY ticker HAVING MAX(last_used) < ?", (cutoff,))
+                if row[0] not in keep]
+        self.drop(idle)
+        if idle:
+            print(f"Evicted {len(idle)} tickers from the OHLCV cache: {', '.join(idle)}")
+        return idle
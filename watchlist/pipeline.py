@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+
+from metrics import metrics, run_with_metrics
+
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_COMPUTE_WORKERS = 2
+
+
+class RunCancelled(Exception):
+    pass
+
+
+def check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise RunCancelled()
+
+
+class RateLimiter:
+    # Token bucket shared by every fetch thread: `rate` requests per second, bursts up to `burst`
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        # A charge above the burst waits for a full bucket and leaves it in debt,
+        # so a chunk of per-ticker requests still pays for every one of them
+        needed = min(tokens, self.burst)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return
+                wait_time = (needed - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class AnalysisPipeline:
+    # Downloads chunks on a thread pool and hands each finished chunk to a
+    # process pool for indicator and signal evaluation, so fetching and
+    # computing overlap. Results stream back ticker by ticker.
+    def __init__(self, fetcher, fetch_workers=DEFAULT_FETCH_WORKERS, compute_workers=DEFAULT_COMPUTE_WORKERS):
+        # compute_workers=0 evaluates chunks in the calling thread instead of a process pool
+        self.fetcher = fetcher
+        self.fetch_workers = fetch_workers
+        self.compute_workers = compute_workers
+
+    def fetch(self, tickers, cancel_event=None, **fetch_kwargs):
+        # Yield {ticker: frame or None} per chunk, in completion order.
+        # Setting cancel_event stops the run between chunks with RunCancelled.
+        tickers = list(dict.fromkeys(tickers))
+        executor = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        try:
+            futures = {executor.submit(self.fetcher.download, chunk, **fetch_kwargs): chunk
+                       for chunk in self.fetcher.chunks(tickers)}
+            for future in as_completed(futures):
+                check_cancelled(cancel_event)
+                frames = future.result()
+                yield {ticker: frames.get(ticker) for ticker in futures[future]}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, tickers, compute, *args, fetch_kwargs=None, cancel_event=None):
+        # compute(frames, *args) must be a module-level function returning {ticker: result}
+        fetch_kwargs = fetch_kwargs or {}
+        if not self.compute_workers:
+            for frames in self.fetch(tickers, cancel_event, **fetch_kwargs):
+                yield from compute(frames, *args).items()
+            return
+
+        executor = ProcessPoolExecutor(max_workers=self.compute_workers)
+        try:
+            pending = set()
+            for frames in self.fetch(tickers, cancel_event, **fetch_kwargs):
+                pending.add(executor.submit(run_with_metrics, compute, frames, *args))
+                done, pending = wait(pending, timeout=0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from self._collect(future)
+            for future in as_completed(pending):
+                check_cancelled(cancel_event)
+                yield from self._collect(future)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _collect(self, future):
+        # Fold the worker's stage timings into this process's metrics
+        result, worker_metrics = future.result()
+        metrics.merge(worker_metrics)
+        return result.items()
@@ -0,0 +1,73 @@
+import asyncio
+
+import discord
+
+from metrics import metrics
+from reports import pack_messages
+
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def retry_after(error):
+    # Seconds to wait before resending, from the exception or the 429's Retry-After header
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class SendQueue:
+    # Every outgoing report message goes through one task, so concurrent reports
+    # don't race each other into the rate limit. A 429 is retried after the
+    # delay Discord asked for instead of failing the report.
+    def __init__(self, max_retries=MAX_RETRIES):
+        self.max_retries = max_retries
+        self.queue = None
+        self.task = None
+
+    def start(self):
+        if self.task is not None and not self.task.done():
+            return
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def send(self, channel, content):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((channel, content, future))
+        return await future
+
+    async def send_report(self, channel, lines):
+        # Pack the report into as few messages as possible and deliver them in order
+        for message in pack_messages(lines):
+            await self.send(channel, message)
+
+    async def _run(self):
+        while True:
+            channel, content, future = await self.queue.get()
+            try:
+                result = await self._deliver(channel, content)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def _deliver(self, channel, content):
+        for attempt in range(self.max_retries):
+            try:
+                with metrics.timer('deliver'):
+                    return await channel.send(content)
+            except (discord.RateLimited, discord.HTTPException) as e:
+                if getattr(e, 'status', 429) != 429 or attempt == self.max_retries - 1:
+                    metrics.increment('send_failures')
+                    raise
+                metrics.increment('send_retries')
+                delay = retry_after(e)
+                print(f"Rate limited sending to {channel}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
@@ -0,0 +1,123 @@
+import pandas as pd
+
+from signals import SIGNALS
+
+MESSAGE_LIMIT = 2000  # Discord's maximum message length in characters
+
+# Report layout: section header followed by the signals listed under it
+DAILY_REPORT = [
+    ("** :place_of_worship: 判断趋势:**", ['bullish', 'bearish', 'above_ma10', 'below_ma10_first']),
+    ("\n\n** :place_of_worship: 卖点提醒:**", ['reduce_position', 'below_ma20', 'e4e12_death_cross', 'e4e50_death_cross',
+                                            'e8e21_death_cross', 'rsi80_overbought', 'macd_death_cross']),
+    ("\n\n** :place_of_worship: 买点提醒:**", ['J1', 'J2', 'short_bottom', 'turning_point', 'break_zero', 'one_cross_three',
+                                            'kdj_buy', 'e4e12_golden_cross', 'e4e50_golden_cross', 'e8e21_golden_cross',
+                                            'rsi20_oversold', 'macd_golden_cross', 'kdj_sell']),
+]
+LONGTERM_REPORT = ['weekly_above_ema13', 'quarterly_above_ma5', 'weekly_below_ema13', 'quarterly_below_ma5']
+FAILURE_LABELS = {'no_data': 'no data', 'delisted': 'delisted', 'transient': 'fetch error'}
+
+
+def format_signal(name, tickers):
+    return f"{SIGNALS[name].label}: " + ', '.join(tickers)
+
+
+def format_skipped(skipped):
+    # skipped: {ticker: failure kind}
+    return "跳过 (Skipped): " + ', '.join(f"{ticker} ({FAILURE_LABELS.get(kind, kind)})" for ticker, kind in skipped.items())
+
+
+def render_daily_report(results, skipped=None):
+    sections = [(header, [name for name in names if name in results]) for header, names in DAILY_REPORT]
+    sections = [(header, names) for header, names in sections if names]
+    lines = []
+    for i, (header, names) in enumerate(sections):
+        if i > 0:
+            lines.append("===============================================================")
+        lines.append(header)
+        lines.extend(format_signal(name, results[name]) for name in names)
+    if skipped:
+        lines.append(format_skipped(skipped))
+    return lines
+
+
+def render_longterm_report(results, watchlist_name, skipped=None):
+    lines = [f"** :place_of_worship: ========== {watchlist_name} = 长期趋势 =======**"]
+    lines.extend(format_signal(name, results[name]) for name in LONGTERM_REPORT if name in results)
+    if skipped:
+        lines.append(format_skipped(skipped))
+    return lines
+
+
+def render_scan_report(expression, matches, total, skipped=None):
+    lines = [f"** :mag: Scan `{expression}`: {len(matches)}/{total}**", ', '.join(matches) or "No matches"]
+    if skipped:
+        lines.append(format_skipped(skipped))
+    return lines
+
+
+def render_changes_report(changes, title, skipped=None):
+    # changes: {signal: (newly fired tickers, cleared tickers)} from SignalHistory.diff
+    lines = [f"** :place_of_worship: {title} 变化 (Changes):**"]
+    for name, (fired, cleared) in changes.items():
+        if fired:
+            lines.append(f"{SIGNALS[name].label} 新增 (new): " + ', '.join(fired))
+        if cleared:
+            lines.append(f"{SIGNALS[name].label} 消失 (cleared): " + ', '.join(cleared))
+    if len(lines) == 1:
+        lines.append("No changes since the previous run")
+    if skipped:
+        lines.append(format_skipped(skipped))
+    return lines
+
+
+def format_alert(ticker, name, fired):
+    # One intraday alert line; fired=False means a previously alerted signal cleared
+    return f"{':bell:' if fired else ':no_bell:'} {ticker} {SIGNALS[name].label}" + ('' if fired else " 消失 (cleared)")
+
+
+def render_history(events):
+    # events: SignalHistory.events() frame, newest first
+    if events.empty:
+        return ["No recorded signals"]
+    return [f"{row.Date:%Y-%m-%d} {row.Ticker} {SIGNALS[row.Signal].label if row.Signal in SIGNALS else row.Signal}"
+            + (f" @ {row.Close:.2f}" if pd.notna(row.Close) else '') for row in events.itertuples()]
+
+
+def split_line(line, limit=MESSAGE_LIMIT):
+    # Break a line longer than the limit at ticker separators, hard-cutting only
+    # when a single piece is itself too long
+    if len(line) <= limit:
+        return [line]
+    pieces = []
+    current = ''
+    for part in line.split(', '):
+        candidate = f"{current}, {part}" if current else part
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        while len(part) > limit:
+            pieces.append(part[:limit])
+            part = part[limit:]
+        current = part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def pack_messages(lines, limit=MESSAGE_LIMIT):
+    # Join report lines into as few messages as fit under the limit
+    messages = []
+    current = ''
+    for line in lines:
+        for piece in split_line(line, limit):
+            candidate = f"{current}\n{piece}" if current else piece
+            if len(candidate) <= limit:
+                current = candidate
+            else:
+                messages.append(current)
+                current = piece
+    if current:
+        messages.append(current)
+    return messages
@@ -0,0 +1,64 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from signals import SIGNALS_VERSION
+
+RESULTS_FILE = 'results_cache.db'
+
+
+class ResultCache:
+    # Signal results per (ticker, timeframe, signal-set version), tagged with the
+    # last daily bar they were computed from. A lookup only hits while that bar
+    # is still the latest one, so a repeat run without new data costs no fetch
+    # and no compute, and a new bar recomputes just the tickers that have it.
+    def __init__(self, db_path=RESULTS_FILE, version=SIGNALS_VERSION):
+        self.version = version
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    ticker TEXT, timeframe TEXT, version INTEGER,
+                    last_date TEXT, results TEXT, computed_at REAL,
+                    PRIMARY KEY (ticker, timeframe, version)
+                )
+            """)
+
+    def get(self, ticker, last_date, names_by_timeframe):
+        # {signal: bool} covering every requested name, or None on a miss
+        last_date = pd.Timestamp(last_date).strftime('%Y-%m-%d')
+        merged = {}
+        with self.lock:
+            for timeframe, names in names_by_timeframe.items():
+                if not names:
+                    continue
+                row = self.conn.execute(
+                    "SELECT results FROM results WHERE ticker = ? AND timeframe = ? AND version = ? AND last_date = ?",
+                    (ticker, timeframe, self.version, last_date)).fetchone()
+                if row is None:
+                    return None
+                stored = json.loads(row[0])
+                if not set(names) <= set(stored):
+                    return None
+                merged.update({name: stored[name] for name in names})
+        return merged
+
+    def put(self, ticker, last_date, names_by_timeframe, results):
+        # Replaces whatever was stored for an older bar
+        last_date = pd.Timestamp(last_date).strftime('%Y-%m-%d')
+        now = time.time()
+        rows = [
+            (ticker, timeframe, self.version, last_date,
+             json.dumps({name: bool(results[name]) for name in names if name in results}), now)
+            for timeframe, names in names_by_timeframe.items() if names
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def drop(self, tickers):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM results WHERE ticker = ?", [(ticker,) for ticker in tickers])
@@ -0,0 +1,180 @@
+import numpy as np
+
+from analyzer import (DAILY_PERIOD, LONGTERM_INTERVALS, LONGTERM_PERIOD, StockAnalyzer, evaluate_frames,
+                      evaluate_longterm_frames)
+from data_fetcher import DataFetcher
+from indicator_engine import IndicatorEngine, Panel
+from ohlcv_cache import period_start
+from pipeline import check_cancelled
+from signals import SIGNALS, required_indicators, signal_names
+
+DAILY = 'daily'
+LONGTERM = 'longterm'
+
+
+class PlannedJob:
+    def __init__(self, key, tickers, kind, signals=None):
+        # signals: names this job reports on, defaults to every registered one
+        self.key = key
+        self.tickers = list(dict.fromkeys(tickers))
+        self.kind = kind
+        self.signals = signals
+
+    def timeframes(self):
+        return ('1d',) if self.kind == DAILY else LONGTERM_INTERVALS
+
+    def names(self, timeframe):
+        if timeframe not in self.timeframes():
+            return []
+        names = signal_names(timeframe)
+        if self.signals is None:
+            return names
+        return [name for name in names if name in self.signals]
+
+
+def trim_frames(frames, start):
+    # Cut longer histories back to the window a shorter job would have fetched
+    return {ticker: None if frame is None else frame[frame.index >= start] for ticker, frame in frames.items()}
+
+
+def evaluate_plan_frames(frames, daily_names, names_by_interval, daily_start):
+    # {ticker: {signal: bool}} for the daily and long-term signals of every planned job;
+    # None for tickers this run has no bars for, which is not the same as nothing firing
+    results = {ticker: {} for ticker in frames}
+    if daily_names:
+        for ticker, result in evaluate_frames(trim_frames(frames, daily_start), daily_names).items():
+            results[ticker].update(result)
+    if names_by_interval:
+        for ticker, result in evaluate_longterm_frames(frames, names_by_interval).items():
+            results[ticker].update(result)
+    return {ticker: None if frames[ticker] is None or frames[ticker].empty else result
+            for ticker, result in results.items()}
+
+
+class RunPlanner:
+    # Runs every job due at the same time as one computation: the union of their
+    # tickers is fetched once at the longest history any job needs and evaluated
+    # once for the union of their signals, then the results are split per job
+    def __init__(self, pipeline=None, fetcher=None, state_store=None, engine=None, result_cache=None, history=None):
+        # result_cache: ResultCache reused while a ticker has no newer bar; needs the fetcher's OHLCV cache
+        # history: SignalHistory the computed results are appended to; also needs the OHLCV cache
+        self.pipeline = pipeline
+        self.fetcher = pipeline.fetcher if pipeline else fetcher or DataFetcher()
+        self.state_store = state_store
+        self.engine = engine or IndicatorEngine()
+        self.result_cache = result_cache if self.fetcher.cache is not None else None
+        self.history = history if self.fetcher.cache is not None else None
+        self.jobs = []
+
+    def add(self, key, tickers, kind, signals=None):
+        self.jobs.append(PlannedJob(key, tickers, kind, signals))
+
+    def tickers(self):
+        return list(dict.fromkeys(ticker for job in self.jobs for ticker in job.tickers))
+
+    def union_names(self, timeframe):
+        wanted = {name for job in self.jobs for name in job.names(timeframe)}
+        return [name for name in signal_names(timeframe) if name in wanted]
+
+    def fetch(self, tickers, fetch_kwargs, cancel_event):
+        if self.pipeline is not None:
+            yield from self.pipeline.fetch(tickers, cancel_event, **fetch_kwargs)
+            return
+        frames = self.fetcher.download(tickers, **fetch_kwargs)
+        check_cancelled(cancel_event)
+        yield {ticker: frames.get(ticker) for ticker in tickers}
+
+    def cached_results(self, tickers, names_by_timeframe, start):
+        # Results for tickers whose cached bars are current and already analyzed at their last bar
+        cached = {}
+        if self.result_cache is None:
+            return cached
+        for ticker in tickers:
+            if self.fetcher.cache.fetch_start(ticker, '1d', start) is not None:
+                continue
+            result = self.result_cache.get(ticker, self.fetcher.cache.last_date(ticker, '1d'), names_by_timeframe)
+            if result is not None:
+                cached[ticker] = result
+        return cached
+
+    def store_results(self, results, names_by_timeframe):
+        if self.result_cache is None:
+            return
+        for ticker, result in results.items():
+            last_date = self.fetcher.cache.last_date(ticker, '1d')
+            if last_date is not None:
+                self.result_cache.put(ticker, last_date, names_by_timeframe, result)
+
+    def record_history(self, results, daily_start):
+        # Fired signals with the close and the indicators each one reads, at the ticker's last daily bar
+        if self.history is None:
+            return
+        fired = {ticker: [name for name, value in result.items() if value] for ticker, result in results.items()}
+        fired = {ticker: names for ticker, names in fired.items() if names}
+        dates = {ticker: self.fetcher.cache.last_date(ticker, '1d') for ticker in results}
+        if not fired:
+            self.history.record(dates, results)
+            return
+        panel = Panel.from_frames({ticker: self.fetcher.cache.load(ticker, '1d', daily_start) for ticker in fired})
+        daily = [name for name in signal_names('1d') if any(name in names for names in fired.values())]
+        indicators = self.engine.compute(panel, required_indicators(daily))
+        values = {}
+        for i, ticker in enumerate(panel.tickers):
+            latest = {key: float(column[-1, i]) for key, column in indicators.items() if not np.isnan(column[-1, i])}
+            values[ticker] = {name: {key: latest.get(key) for key in ('Close',) + tuple(SIGNALS[name].requires)
+                                     if SIGNALS[name].timeframe == '1d' or key == 'Close'}
+                              for name in fired[ticker]}
+        self.history.record(dates, results, values)
+
+    def run(self, progress=None, cancel_event=None):
+        # {job key: {signal: [tickers that fired]}}, each in its watchlist's order
+        daily_names = self.union_names('1d')
+        names_by_interval = {interval: self.union_names(interval) for interval in LONGTERM_INTERVALS
+                             if any(job.kind == LONGTERM for job in self.jobs)}
+        fetch_kwargs = {'period': LONGTERM_PERIOD if names_by_interval else DAILY_PERIOD, 'interval': '1d'}
+        daily_start = period_start(DAILY_PERIOD)
+        names_by_timeframe = {'1d': daily_names, **names_by_interval}
+
+        universe = self.tickers()
+        results = self.cached_results(universe, names_by_timeframe, period_start(fetch_kwargs['period']))
+        tickers = [ticker for ticker in universe if ticker not in results]
+        computed = {}
+
+        def report_progress():
+            if progress is not None:
+                progress(len(results) + len(computed), len(universe))
+
+        report_progress()
+        if self.state_store is not None:
+            # Incremental daily updates need the state in this process, so evaluate chunks as they arrive
+            analyzer = StockAnalyzer(tickers, engine=self.engine, state_store=self.state_store)
+            for frames in self.fetch(tickers, fetch_kwargs, cancel_event):
+                chunk = evaluate_plan_frames(frames, [], names_by_interval, daily_start)
+                if daily_names:
+                    for ticker, result in analyzer.analyze_incremental(trim_frames(frames, daily_start), daily_names).items():
+                        if chunk[ticker] is not None:
+                            chunk[ticker].update(result)
+                computed.update(chunk)
+                report_progress()
+            self.state_store.save()
+        elif self.pipeline is not None:
+            for ticker, result in self.pipeline.run(tickers, evaluate_plan_frames, daily_names, names_by_interval,
+                                                    daily_start, fetch_kwargs=fetch_kwargs, cancel_event=cancel_event):
+                computed[ticker] = result
+                report_progress()
+        else:
+            for frames in self.fetch(tickers, fetch_kwargs, cancel_event):
+                computed.update(evaluate_plan_frames(frames, daily_names, names_by_interval, daily_start))
+        # Tickers without bars in this run, e.g. skipped by the failure registry, count as not fired
+        # and leave the cached results and history of their last bar alone
+        fetched = {ticker: result for ticker, result in computed.items() if result is not None}
+        self.store_results(fetched, names_by_timeframe)
+        self.record_history(fetched, daily_start)
+        results.update(fetched)
+        if progress is not None:
+            progress(len(universe), len(universe))
+        return {job.key: self.collect(job, results) for job in self.jobs}
+
+    def collect(self, job, results):
+        names = [name for timeframe in job.timeframes() for name in job.names(timeframe)]
+        return {name: [ticker for ticker in job.tickers if results.get(ticker, {}).get(name, False)] for name in names}
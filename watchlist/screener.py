@@ -0,0 +1,168 @@
+import ast
+import functools
+import re
+
+import numpy as np
+
+from analyzer import DAILY_PERIOD, LONGTERM_PERIOD
+from indicator_engine import FIELDS, IndicatorEngine, Panel, get_indicator
+from metrics import metrics
+from signals import SignalView
+
+COMPARISONS = {ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less, ast.LtE: np.less_equal,
+               ast.Eq: np.equal, ast.NotEq: np.not_equal}
+ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+MAX_OFFSET = 250  # Furthest back prev() may look, in bars
+SCAN_DAILY_BARS = 500  # Bars DAILY_PERIOD covers; screens reading longer windows fetch LONGTERM_PERIOD
+
+
+class ScanError(ValueError):
+    pass
+
+
+def column_name(name):
+    # Expressions are case-insensitive: close -> Close, ma20 -> MA20, rsi -> RSI
+    for field in FIELDS:
+        if name.lower() == field.lower():
+            return field
+    column = name.upper()
+    try:
+        get_indicator(column)
+    except KeyError:
+        raise ScanError(f"Unknown indicator: {name}") from None
+    return column
+
+
+class Screen:
+    # An expression compiled into a tree of closures over whole indicator arrays.
+    # Every node evaluates all tickers and bars at once; its offset argument
+    # shifts it back in time, which is how prev() and cross() see earlier bars.
+    def __init__(self, expression):
+        self.expression = expression
+        self.requires = []
+        self.lookback = 0
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ScanError(f"Invalid expression: {e.msg}") from None
+        self.func, kind = self.compile(tree.body, 0)
+        if kind != 'bool':
+            raise ScanError("Expression must be a condition, e.g. close > ma20")
+        self.lookback = max(self.lookback, 1)
+
+    def window(self):
+        # Longest MA/EMA window read, i.e. the history the expression needs to be meaningful
+        windows = [int(match.group(1)) for name in self.requires for match in [re.fullmatch(r'E?MA(\d+)', name)] if match]
+        return max(windows, default=0) + self.lookback
+
+    def compile(self, node, depth):
+        # Returns (func(view, offset) -> array, 'bool' or 'number'); depth is how far back the node is read
+        if isinstance(node, ast.BoolOp):
+            parts = [self.condition(value, depth) for value in node.values]
+            reduce = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return lambda v, n: functools.reduce(reduce, (part(v, n) for part in parts)), 'bool'
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = self.condition(node.operand, depth)
+            return lambda v, n: np.logical_not(operand(v, n)), 'bool'
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self.number(node.operand, depth)
+            sign = -1 if isinstance(node.op, ast.USub) else 1
+            return lambda v, n: sign * operand(v, n), 'number'
+        if isinstance(node, ast.Compare):
+            # a < b < c means a < b and b < c, as in Python
+            operands = [self.number(operand, depth) for operand in [node.left] + node.comparators]
+            ops = [self.lookup(COMPARISONS, op) for op in node.ops]
+            pairs = list(zip(ops, operands, operands[1:]))
+            return lambda v, n: functools.reduce(np.logical_and, (op(a(v, n), b(v, n)) for op, a, b in pairs)), 'bool'
+        if isinstance(node, ast.BinOp):
+            op = self.lookup(ARITHMETIC, node.op)
+            left, right = self.number(node.left, depth), self.number(node.right, depth)
+            return lambda v, n: op(left(v, n), right(v, n)), 'number'
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda v, n: value, 'number'
+        if isinstance(node, ast.Name):
+            column = column_name(node.id)
+            if column not in self.requires:
+                self.requires.append(column)
+            self.lookback = max(self.lookback, depth)
+            return lambda v, n: v.prev(column, n), 'number'
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            return self.call(node.func.id.lower(), node.args, depth)
+        raise ScanError(f"Unsupported syntax: {ast.unparse(node)}")
+
+    def call(self, name, args, depth):
+        if name in ('cross', 'cross_down') and len(args) == 2:
+            # Same definition as SignalView.cross: on the right side now, on the other side (or equal) one bar ago
+            a, b = (self.number(arg, depth + 1) for arg in args)
+            now, before = (np.greater, np.less_equal) if name == 'cross' else (np.less, np.greater_equal)
+            return lambda v, n: now(a(v, n), b(v, n)) & before(a(v, n + 1), b(v, n + 1)), 'bool'
+        if name in ('prev', 'ref') and len(args) in (1, 2):
+            bars = self.offset(args[1]) if len(args) == 2 else 1
+            value = self.number(args[0], depth + bars)
+            return lambda v, n: value(v, n + bars), 'number'
+        if name == 'abs' and len(args) == 1:
+            value = self.number(args[0], depth)
+            return lambda v, n: np.abs(value(v, n)), 'number'
+        if name in ('min', 'max') and len(args) >= 2:
+            values = [self.number(arg, depth) for arg in args]
+            reduce = np.fmin if name == 'min' else np.fmax
+            return lambda v, n: functools.reduce(reduce, (value(v, n) for value in values)), 'number'
+        raise ScanError(f"Unknown function or wrong arguments: {name}()")
+
+    def offset(self, node):
+        if not (isinstance(node, ast.Constant) and isinstance(node.value, int) and 0 < node.value <= MAX_OFFSET):
+            raise ScanError(f"prev() takes a whole number of bars between 1 and {MAX_OFFSET}")
+        return node.value
+
+    def condition(self, node, depth):
+        func, kind = self.compile(node, depth)
+        if kind != 'bool':
+            raise ScanError(f"Expected a condition: {ast.unparse(node)}")
+        return func
+
+    def number(self, node, depth):
+        func, kind = self.compile(node, depth)
+        if kind != 'number':
+            raise ScanError(f"Expected a value: {ast.unparse(node)}")
+        return func
+
+    def lookup(self, table, op):
+        if type(op) not in table:
+            raise ScanError(f"Unsupported operator: {type(op).__name__}")
+        return table[type(op)]
+
+    def evaluate(self, indicators):
+        # One boolean per ticker for its latest bar; indicators hold at least lookback + 1 bars
+        tail = {key: values[-(self.lookback + 1):] for key, values in indicators.items()}
+        view = SignalView(tail, self.lookback)
+        with np.errstate(all='ignore'):
+            result = self.func(view, 0)
+        return np.broadcast_to(result, tail['Close'][self.lookback:].shape)[-1]
+
+
+@functools.lru_cache(maxsize=64)
+def compile_scan(expression):
+    # Repeating a screen reuses its compiled form
+    return Screen(expression)
+
+
+def scan_period(expression):
+    # History to fetch so every bar the screen reads is present
+    return DAILY_PERIOD if compile_scan(expression).window() <= SCAN_DAILY_BARS else LONGTERM_PERIOD
+
+
+def scan_panel(panel, expression, engine=None):
+    screen = compile_scan(expression)
+    engine = engine or IndicatorEngine()
+    indicators = engine.compute(panel, screen.requires)
+    with metrics.timer('scan', tickers=panel.tickers):
+        matches = screen.evaluate(indicators)
+    return [ticker for ticker, match in zip(panel.tickers, matches) if match]
+
+
+def scan_frames(frames, expression, engine=None):
+    # Tickers whose latest bar satisfies the expression, in the order of frames
+    screen = compile_scan(expression)
+    panel = Panel.from_frames(frames, min_length=screen.lookback + 1)
+    return scan_panel(panel, expression, engine)
@@ -0,0 +1,123 @@
+import json
+import sqlite3
+import threading
+
+import pandas as pd
+
+HISTORY_FILE = 'signal_history.db'
+DIFF_DEPTH = 10  # Evaluations per ticker searched for a signal's previous one, e.g. daily runs before a weekly one
+
+
+def _day(date):
+    return pd.Timestamp(date).strftime('%Y-%m-%d')
+
+
+class SignalHistory:
+    # Every fired signal as one row (date, ticker, signal, close, key indicator
+    # values), plus the dates each ticker was evaluated on. The evaluations make
+    # "not fired" distinguishable from "not looked at", which is what the
+    # day-over-day diff needs. Queries read only this store, never market data.
+    def __init__(self, db_path=HISTORY_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    date TEXT, ticker TEXT, signal TEXT, close REAL, indicators TEXT,
+                    PRIMARY KEY (ticker, date, signal)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_by_signal ON events (signal, date)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    ticker TEXT, date TEXT, signals TEXT,
+                    PRIMARY KEY (ticker, date)
+                ) WITHOUT ROWID
+            """)
+
+    def record(self, date_by_ticker, results, values=None):
+        # results: {ticker: {signal: bool}} evaluated at date_by_ticker[ticker];
+        # values: {ticker: {signal: {'Close': ..., indicator: ...}}} for the fired ones.
+        # Re-recording a date replaces it, so a provisional bar's events do not linger.
+        values = values or {}
+        with self.lock, self.conn:
+            for ticker, result in results.items():
+                date = date_by_ticker.get(ticker)
+                if date is None or not result:
+                    continue
+                date = _day(date)
+                row = self.conn.execute("SELECT signals FROM evaluations WHERE ticker = ? AND date = ?",
+                                        (ticker, date)).fetchone()
+                evaluated = sorted(set(json.loads(row[0]) if row else []) | set(result))
+                self.conn.execute("INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?)",
+                                  (ticker, date, json.dumps(evaluated)))
+                self.conn.executemany("DELETE FROM events WHERE ticker = ? AND date = ? AND signal = ?",
+                                      [(ticker, date, name) for name in result])
+                rows = []
+                for name, fired in result.items():
+                    if not fired:
+                        continue
+                    snapshot = values.get(ticker, {}).get(name, {})
+                    rows.append((date, ticker, name, snapshot.get('Close'),
+                                 json.dumps({key: value for key, value in snapshot.items() if key != 'Close'})))
+                self.conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", rows)
+
+    def diff(self, tickers, names, depth=DIFF_DEPTH):
+        # {signal: (newly fired tickers, cleared tickers)} between each ticker's
+        # latest evaluation of a signal and the one before it, in watchlist order.
+        # Two queries in total: recent evaluations, then the events on those dates.
+        tickers = list(tickers)
+        with self.lock:
+            evaluations = self.conn.execute("""
+                SELECT ticker, date, signals FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS age FROM evaluations
+                ) WHERE age <= ?
+            """, (depth,)).fetchall()
+            wanted = set(tickers)
+            evaluations = [(ticker, date, signals) for ticker, date, signals in evaluations if ticker in wanted]
+            oldest = min((date for _, date, _ in evaluations), default=None)
+            events = set() if oldest is None else set(self.conn.execute(
+                "SELECT ticker, date, signal FROM events WHERE date >= ?", (oldest,)))
+
+        dates = {}  # (ticker, signal) -> evaluation dates, newest first
+        for ticker, date, signals in sorted(evaluations, key=lambda row: row[1], reverse=True):
+            for name in json.loads(signals):
+                dates.setdefault((ticker, name), []).append(date)
+        changes = {name: ([], []) for name in names}
+        for ticker in tickers:
+            for name in names:
+                evaluated = dates.get((ticker, name))
+                if not evaluated:
+                    continue
+                now = (ticker, evaluated[0], name) in events
+                before = len(evaluated) > 1 and (ticker, evaluated[1], name) in events
+                if now and not before:
+                    changes[name][0].append(ticker)
+                elif before and not now:
+                    changes[name][1].append(ticker)
+        return changes
+
+    def last_fired(self, ticker, name):
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(date) FROM events WHERE ticker = ? AND signal = ?",
+                                    (ticker, name)).fetchone()
+        return None if row[0] is None else pd.Timestamp(row[0])
+
+    def events(self, ticker=None, signal=None, start=None, end=None, limit=None):
+        # Fired signals as a DataFrame, newest first; filters use the ticker or signal index
+        query = "SELECT date, ticker, signal, close, indicators FROM events WHERE 1 = 1"
+        params = []
+        for clause, value in (("ticker = ?", ticker), ("signal = ?", signal),
+                              ("date >= ?", start and _day(start)), ("date < ?", end and _day(end))):
+            if value is not None:
+                query += f" AND {clause}"
+                params.append(value)
+        query += " ORDER BY date DESC, ticker, signal"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return pd.DataFrame([(pd.Timestamp(date), ticker, signal, close, json.loads(indicators))
+                             for date, ticker, signal, close, indicators in rows],
+                            columns=['Date', 'Ticker', 'Signal', 'Close', 'Indicators'])
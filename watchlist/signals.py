@@ -0,0 +1,243 @@
+from indicator_engine import IndicatorEngine
+from metrics import metrics
+
+
+class Signal:
+    def __init__(self, name, label, requires, predicate, lookback=1, timeframe='1d'):
+        self.name = name
+        self.label = label
+        self.requires = requires
+        self.predicate = predicate
+        self.lookback = lookback
+        self.timeframe = timeframe
+
+
+SIGNALS = {}
+SIGNALS_VERSION = 1  # Bump when a predicate or indicator changes, so cached results are recomputed
+
+
+def register_signal(name, label, requires, lookback=1, timeframe='1d'):
+    # requires lists the indicator columns the predicate reads; only those get computed
+    def decorator(predicate):
+        SIGNALS[name] = Signal(name, label, requires, predicate, lookback, timeframe)
+        return predicate
+    return decorator
+
+
+def signal_names(timeframe='1d'):
+    return [name for name, signal in SIGNALS.items() if signal.timeframe == timeframe]
+
+
+class SignalView:
+    # Row-aligned access to indicator arrays: cur() is bar t and prev(n) is
+    # bar t - n, for every bar t that has `lookback` bars before it
+    def __init__(self, indicators, lookback):
+        self.indicators = indicators
+        self.lookback = lookback
+
+    def prev(self, name, n=1):
+        values = self.indicators[name]
+        return values[self.lookback - n:len(values) - n]
+
+    def cur(self, name):
+        return self.prev(name, 0)
+
+    def cross(self, name1, name2):
+        return (self.cur(name1) > self.cur(name2)) & (self.prev(name1) <= self.prev(name2))
+
+    def cross_down(self, name1, name2):
+        return (self.cur(name1) < self.cur(name2)) & (self.prev(name1) >= self.prev(name2))
+
+
+def required_indicators(names):
+    required = []
+    for name in names:
+        for indicator in SIGNALS[name].requires:
+            if indicator not in required:
+                required.append(indicator)
+    return required
+
+
+def max_lookback(names):
+    return max((SIGNALS[name].lookback for name in names), default=1)
+
+
+def evaluate_history(panel, names, engine=None):
+    # Boolean arrays of shape (bars - lookback, tickers), aligned to panel rows lookback..end
+    engine = engine or IndicatorEngine()
+    lookback = max_lookback(names)
+    view = SignalView(engine.compute(panel, required_indicators(names)), lookback)
+    with metrics.timer('signals', mode='history'):
+        return {name: SIGNALS[name].predicate(view) for name in names}, lookback
+
+
+def evaluate_tail(indicators, names):
+    # indicators hold at least the last lookback + 1 bars; returns one boolean per ticker
+    lookback = max_lookback(names)
+    tail = {key: values[-(lookback + 1):] for key, values in indicators.items()}
+    view = SignalView(tail, lookback)
+    with metrics.timer('signals', mode='latest'):
+        return {name: SIGNALS[name].predicate(view)[-1] for name in names}
+
+
+def evaluate_latest(panel, names, engine=None):
+    # One boolean per ticker for the latest bar of each ticker
+    engine = engine or IndicatorEngine()
+    return evaluate_tail(engine.compute(panel, required_indicators(names)), names)
+
+
+# Daily signals
+
+@register_signal('bullish', "多头排列 (Bullish Alignment)", ('Close', 'MA10', 'MA20', 'MA60'))
+def bullish(v):
+    return (v.cur('Close') > v.cur('MA10')) & (v.cur('MA10') > v.cur('MA20')) & (v.cur('MA20') > v.cur('MA60'))
+
+
+@register_signal('bearish', "强烈空头趋势 (Strong Bearish Trend)", ('Close', 'MA60'))
+def bearish(v):
+    return v.cur('Close') < v.cur('MA60')
+
+
+@register_signal('above_ma10', "ma10之上 (Close Above MA10)", ('Close', 'MA10'))
+def above_ma10(v):
+    return (v.cur('Close') > v.cur('MA10')) & (v.prev('Close') <= v.prev('MA10'))
+
+
+@register_signal('below_ma10_first', "小仓位ma10之下 (Close Below MA10)", ('Close', 'MA10'))
+def below_ma10_first(v):
+    return (v.cur('Close') < v.cur('MA10')) & (v.prev('Close') >= v.prev('MA10'))
+
+
+@register_signal('below_ma10', "破ma10 (Close Below MA10)", ('Close', 'MA10'))
+def below_ma10(v):
+    return (v.cur('Close') < v.cur('MA10')) & (v.prev('Close') > v.prev('MA10'))
+
+
+@register_signal('death_cross', "ma5死叉ma10 (MA5 and MA10 Death Cross)", ('MA5', 'MA10'))
+def death_cross(v):
+    return (v.cur('MA5') < v.cur('MA10')) & (v.prev('MA5') > v.prev('MA10'))
+
+
+@register_signal('reduce_position', "减仓 (破 ma10)", ('Close', 'MA5', 'MA10'))
+def reduce_position(v):
+    return below_ma10(v) & death_cross(v)
+
+
+@register_signal('below_ma20', "清仓 (破 ma20)", ('Close', 'MA20'))
+def below_ma20(v):
+    return (v.cur('Close') < v.cur('MA20')) & (v.prev('Close') > v.prev('MA20'))
+
+
+@register_signal('e4e12_death_cross', "e4e12减四成 (EMA4 and EMA12 Death Cross)", ('EMA4', 'EMA12'))
+def e4e12_death_cross(v):
+    return v.cross_down('EMA4', 'EMA12')
+
+
+@register_signal('e4e50_death_cross', "e4e50清仓 (EMA4 and EMA50 Death Cross)", ('EMA4', 'EMA50'))
+def e4e50_death_cross(v):
+    return v.cross_down('EMA4', 'EMA50')
+
+
+@register_signal('e8e21_death_cross', "e8e21死叉 (EMA8 and EMA21 Death Cross)", ('EMA8', 'EMA21'))
+def e8e21_death_cross(v):
+    return v.cross_down('EMA8', 'EMA21')
+
+
+@register_signal('rsi80_overbought', "RSI80超买 (RSI >= 80)", ('RSI',))
+def rsi80_overbought(v):
+    return (v.cur('RSI') >= 80) & (v.prev('RSI') < 80)
+
+
+@register_signal('macd_death_cross', "macd死叉 (MACD Death Cross)", ('DIF', 'DEA'))
+def macd_death_cross(v):
+    return v.cross_down('DIF', 'DEA') & (v.prev('DIF') > v.prev('DEA'))
+
+
+@register_signal('J1', "J1", ('J', 'MA20', 'MA60', 'MA120'))
+def j1(v):
+    return ((v.cur('J') <= 1) & (v.cur('MA20') >= v.cur('MA60')) & (v.cur('MA20') >= v.prev('MA20'))
+            & (v.cur('MA60') >= v.prev('MA60')) & (v.cur('MA120') < v.prev('MA120')))
+
+
+@register_signal('J2', "J2", ('J', 'MA20', 'MA60', 'MA120'))
+def j2(v):
+    return ((v.cur('J') <= 1) & (v.cur('MA20') >= v.cur('MA60')) & (v.cur('MA20') >= v.prev('MA20'))
+            & (v.cur('MA60') >= v.prev('MA60')) & (v.cur('MA120') >= v.prev('MA120')))
+
+
+@register_signal('short_bottom', "短底成型 (Short Bottom Formation)", ('Close', 'MA5', 'MA10', 'K'))
+def short_bottom(v):
+    return (v.cur('Close') > v.cur('MA10')) & (v.cur('MA5') >= v.prev('MA5')) & (v.cur('K') >= 50) & (v.prev('K') < 50)
+
+
+@register_signal('turning_point', "MA5拐点 (MA 5 Turning Point)", ('Close', 'MA5'), lookback=4)
+def turning_point(v):
+    return ((v.cur('MA5') < v.prev('MA5')) & (v.cur('Close') > v.prev('Close', 4))
+            & (v.prev('Close', 4) > v.prev('Close', 3)) & (v.prev('Close', 3) > v.prev('Close', 2)))
+
+
+@register_signal('break_zero', "破零 (Break Zero)", ('J', 'D', 'DIF', 'DEA'))
+def break_zero(v):
+    return (v.cur('J') < 0) & (v.cur('D') > 50) & (v.cur('DIF') > v.cur('DEA'))
+
+
+@register_signal('one_cross_three', "一穿三 (One Cross Three)", ('Close', 'MA5', 'MA10', 'MA20'))
+def one_cross_three(v):
+    return v.cross('Close', 'MA5') & v.cross('Close', 'MA10') & v.cross('Close', 'MA20')
+
+
+@register_signal('kdj_buy', "KDJ 买点 (KDJ Buy Point)", ('D', 'J', 'DIF', 'DEA'))
+def kdj_buy(v):
+    return (v.cur('D') > 50) & v.cross('DIF', 'DEA') & (v.prev('J') <= 0) & (v.cur('J') > 0)
+
+
+@register_signal('e4e12_golden_cross', "e4e12加四成 (EMA4 and EMA12 Golden Cross)", ('EMA4', 'EMA12'))
+def e4e12_golden_cross(v):
+    return v.cross('EMA4', 'EMA12')
+
+
+@register_signal('e4e50_golden_cross', "e4e50满仓 (EMA4 and EMA50 Golden Cross)", ('EMA4', 'EMA50'))
+def e4e50_golden_cross(v):
+    return v.cross('EMA4', 'EMA50')
+
+
+@register_signal('e8e21_golden_cross', "e8e21金叉 (EMA8 and EMA21 Golden Cross)", ('EMA8', 'EMA21'))
+def e8e21_golden_cross(v):
+    return v.cross('EMA8', 'EMA21')
+
+
+@register_signal('rsi20_oversold', "RSI20超卖 (RSI <= 20)", ('RSI',))
+def rsi20_oversold(v):
+    return (v.cur('RSI') <= 20) & (v.prev('RSI') > 20)
+
+
+@register_signal('macd_golden_cross', "macd金叉 (MACD Golden Cross)", ('DIF', 'DEA'))
+def macd_golden_cross(v):
+    return v.cross('DIF', 'DEA') & (v.prev('DIF') < v.prev('DEA'))
+
+
+@register_signal('kdj_sell', "KDJ 超跌 (KDJ Sell Point)", ('K', 'D'))
+def kdj_sell(v):
+    return (v.cur('K') < 10) & (v.cur('D') < 10)
+
+
+# Long-term signals, evaluated on bars derived from the daily history
+
+@register_signal('weekly_above_ema13', "周线上穿EMA13 (Weekly Close Above EMA13)", ('Close', 'EMA13'), timeframe='1wk')
+def weekly_above_ema13(v):
+    return (v.cur('Close') > v.cur('EMA13')) & (v.prev('Close') <= v.prev('EMA13'))
+
+
+@register_signal('weekly_below_ema13', "周线下穿EMA13 (Weekly Close Below EMA13)", ('Close', 'EMA13'), timeframe='1wk')
+def weekly_below_ema13(v):
+    return (v.cur('Close') < v.cur('EMA13')) & (v.prev('Close') >= v.prev('EMA13'))
+
+
+@register_signal('quarterly_above_ma5', "季度线上穿MA5 (Quarterly Close Above MA5)", ('Close', 'MA5'), timeframe='3mo')
+def quarterly_above_ma5(v):
+    return (v.cur('Close') > v.cur('MA5')) & (v.prev('Close') <= v.prev('MA5'))
+
+
+@register_signal('quarterly_below_ma5', "季度线下穿MA5 (Quarterly Close Below MA5)", ('Close', 'MA5'), timeframe='3mo')
+def quarterly_below_ma5(v):
+    return (v.cur('Close') < v.cur('MA5')) & (v.prev('Close') >= v.prev('MA5'))
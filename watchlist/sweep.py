@@ -0,0 +1,271 @@
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import BATCH_SIZE, FORWARD_HORIZONS
+from data_fetcher import DataFetcher
+from indicator_engine import Panel, ema, ewm_mean, prefix_sums, rolling_mean, shift
+from metrics import metrics
+from ohlcv_cache import OHLCVCache
+from watchlist_parser import WatchlistParser
+
+# Parameter grids per family; the registered signals' defaults are in every grid
+SWEEP_GRID = {
+    'ma_cross': {'window': [5, 10, 20, 30, 60, 120]},
+    'ema_cross': {'fast': [4, 5, 8, 12], 'slow': [12, 21, 26, 50]},
+    'kdj_cross': {'n': [5, 9, 14, 21], 'k_period': [2, 3, 5], 'd_period': [2, 3, 5]},
+    'macd_cross': {'fast': [8, 12, 16], 'slow': [21, 26, 34], 'signal': [5, 9, 12]},
+    'rsi_oversold': {'period': [6, 9, 14, 21], 'threshold': [20, 25, 30]},
+}
+
+
+class SweepArrays:
+    # Everything the parameter sets of one panel share, computed at most once:
+    # prefix sums of Close and of RSI's gains and losses, so every MA window is
+    # one subtraction per bar; sparse tables of Low and High, so every KDJ
+    # window's rolling extremes are two lookups per bar; and EMAs by span,
+    # shared between the EMA and MACD grids.
+    def __init__(self, panel):
+        self.panel = panel
+        self.close = panel['Close']
+        self.present = panel.present
+        self.cache = {}
+
+    def cached(self, key, compute):
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def ma(self, window):
+        prefix = self.cached('close_prefix', lambda: prefix_sums(self.close))
+        return self.cached(('ma', window), lambda: rolling_mean(self.close, window, prefix=prefix))
+
+    def ema(self, span):
+        return self.cached(('ema', span), lambda: ema(self.close, span))
+
+    def sparse_table(self, field, reduce, levels):
+        # table[k, i] = reduce of rows i .. i + 2**k - 1, NaN where all of them are
+        table = self.cache.get(('table', field))
+        if table is None or len(table) < levels:
+            values = self.panel[field]
+            table = np.full((levels,) + values.shape, np.nan)
+            table[0] = values
+            for k in range(1, levels):
+                half = 1 << (k - 1)
+                table[k, :len(values) - half] = reduce(table[k - 1, :len(values) - half], table[k - 1, half:])
+                table[k, len(values) - half:] = table[k - 1, len(values) - half:]
+            self.cache[('table', field)] = table
+        return table
+
+    def rolling_extreme(self, field, window, reduce):
+        # rolling_min/rolling_max(values, window, min_periods=1) from two overlapping power-of-two blocks
+        key = ('extreme', field, window)
+        if key not in self.cache:
+            rows = np.arange(len(self.close))
+            start = np.maximum(rows - window + 1, 0)
+            level = np.floor(np.log2(rows - start + 1)).astype(int)
+            table = self.sparse_table(field, reduce, int(level.max(initial=0)) + 1)
+            self.cache[key] = reduce(table[level, start], table[level, rows - (1 << level) + 1])
+        return self.cache[key]
+
+    def kdj(self, n, k_period, d_period):
+        def compute():
+            low_min = self.rolling_extreme('Low', n, np.fmin)
+            high_max = self.rolling_extreme('High', n, np.fmax)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rsv = (self.close - low_min) / (high_max - low_min) * 100
+            k = self.cached(('K', n, k_period), lambda: ewm_mean(rsv, 1.0 / k_period, min_periods=1))
+            return k, ewm_mean(k, 1.0 / d_period, min_periods=1)
+        return self.cached(('kdj', n, k_period, d_period), compute)
+
+    def macd(self, fast, slow, signal):
+        def compute():
+            dif = self.ema(fast) - self.ema(slow)
+            return dif, ema(dif, signal)
+        return self.cached(('macd', fast, slow, signal), compute)
+
+    def rsi(self, period):
+        def compute():
+            # Same as indicator_engine.rsi, with the prefix sums shared across periods
+            (gain, gain_prefix), (loss, loss_prefix) = self.cached('rsi_prefix', self.rsi_prefix)
+            avg_gain = rolling_mean(gain, period, prefix=gain_prefix)
+            avg_loss = rolling_mean(loss, period, prefix=loss_prefix)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return 100 - (100 / (1 + avg_gain / avg_loss))
+        return self.cached(('rsi', period), compute)
+
+    def rsi_prefix(self):
+        delta = self.close - shift(self.close)
+        # Padding rows are not bars; pandas would never have seen them
+        gain = np.where(self.present, np.where(delta > 0, delta, 0.0), np.nan)
+        loss = np.where(self.present, np.where(delta < 0, -delta, 0.0), np.nan)
+        return (gain, prefix_sums(gain)), (loss, prefix_sums(loss))
+
+
+def crossed(fast, slow):
+    # Same as SignalView.cross on every bar; row 0 has no previous bar
+    fired = np.zeros(fast.shape, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        fired[1:] = (fast[1:] > slow[1:]) & (fast[:-1] <= slow[:-1])
+    return fired
+
+
+def ma_cross(arrays, window):
+    # Close crosses above MA(window), as above_ma10
+    return crossed(arrays.close, arrays.ma(window))
+
+
+def ema_cross(arrays, fast, slow):
+    # As e4e12_golden_cross
+    return crossed(arrays.ema(fast), arrays.ema(slow))
+
+
+def kdj_cross(arrays, n, k_period, d_period):
+    # K crosses above D
+    return crossed(*arrays.kdj(n, k_period, d_period))
+
+
+def macd_cross(arrays, fast, slow, signal):
+    # As macd_golden_cross
+    dif, dea = arrays.macd(fast, slow, signal)
+    fired = crossed(dif, dea)
+    with np.errstate(invalid='ignore'):
+        fired[1:] &= dif[:-1] < dea[:-1]
+    return fired
+
+
+def rsi_oversold(arrays, period, threshold):
+    # As rsi20_oversold
+    value = arrays.rsi(period)
+    fired = np.zeros(value.shape, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        fired[1:] = (value[1:] <= threshold) & (value[:-1] > threshold)
+    return fired
+
+
+FAMILIES = {'ma_cross': ma_cross, 'ema_cross': ema_cross, 'kdj_cross': kdj_cross,
+            'macd_cross': macd_cross, 'rsi_oversold': rsi_oversold}
+
+
+def parameter_sets(grid):
+    # [(family, params)] for every combination in the grid; crosses of a line with itself are left out
+    sets = []
+    for family, params in grid.items():
+        names = list(params)
+        for values in itertools.product(*(params[name] for name in names)):
+            combination = dict(zip(names, values))
+            if 'fast' in combination and combination['fast'] >= combination['slow']:
+                continue
+            sets.append((family, combination))
+    return sets
+
+
+def forward_returns(panel, horizons):
+    # {h: close-to-close return h bars later}, NaN where the history ends first
+    close = panel['Close']
+    returns = {}
+    for horizon in horizons:
+        ahead = np.full(close.shape, np.nan)
+        ahead[:len(close) - horizon] = close[horizon:]
+        returns[horizon] = ahead / close - 1
+    return returns
+
+
+def sweep_frames(frames, sets, horizons=FORWARD_HORIZONS):
+    # Per parameter set: [events, then (returns, hits, return sum) per horizon],
+    # plain sums so the batches of a sweep can be added up
+    panel = Panel.from_frames(frames)
+    totals = {}
+    if not panel.tickers:
+        return totals
+    arrays = SweepArrays(panel)
+    returns = forward_returns(panel, horizons)
+    # Padding rows are not bars; a cross needs the bar and the one before it
+    bars = panel.present.copy()
+    bars[1:] &= panel.present[:-1]
+    bars[0] = False
+    for family, params in sets:
+        fired = FAMILIES[family](arrays, **params) & bars
+        counts = [int(fired.sum())]
+        for horizon in horizons:
+            hit_returns = returns[horizon][fired]
+            hit_returns = hit_returns[~np.isnan(hit_returns)]
+            counts += [len(hit_returns), int((hit_returns > 0).sum()), float(hit_returns.sum())]
+        totals[(family, tuple(params.items()))] = counts
+    return totals
+
+
+def summarize_sweep(totals, horizons=FORWARD_HORIZONS):
+    # Same columns as backtest.summarize, one row per parameter set
+    rows = []
+    for (family, params), counts in totals.items():
+        row = {'Family': family, 'Params': ' '.join(f'{name}={value}' for name, value in params), 'Events': counts[0]}
+        for i, horizon in enumerate(horizons):
+            observed, hits, total = counts[1 + 3 * i:4 + 3 * i]
+            row[f'HitRate_{horizon}d'] = hits / observed if observed else np.nan
+            row[f'MeanReturn_{horizon}d'] = total / observed if observed else np.nan
+        rows.append(row)
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).sort_values(['Family', f'MeanReturn_{horizons[-1]}d'], ascending=[True, False],
+                                          ignore_index=True)
+
+
+def sweep_history(tickers, grid=None, period='10y', start=None, end=None, horizons=FORWARD_HORIZONS,
+                  workers=None, batch_size=BATCH_SIZE, fetcher=None):
+    # Every parameter set over the whole universe; each worker takes a ticker
+    # batch and evaluates all sets on it, so the shared arrays are built once per batch
+    sets = parameter_sets(grid or SWEEP_GRID)
+    fetcher = fetcher or DataFetcher()
+    frames = fetcher.download(tickers, period=None if start else period, start=start, end=end, interval='1d')
+
+    batches = [
+        {ticker: frames[ticker] for ticker in tickers[i:i + batch_size] if ticker in frames}
+        for i in range(0, len(tickers), batch_size)
+    ]
+    totals = {}
+    with metrics.timer('sweep', tickers=tickers):
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(sweep_frames, batches, [sets] * len(batches), [horizons] * len(batches)):
+                for key, counts in result.items():
+                    totals[key] = [a + b for a, b in zip(totals[key], counts)] if key in totals else counts
+    return summarize_sweep(totals, horizons)
+
+
+def parse_grid(families, overrides):
+    # overrides: ['kdj_cross.n=5,9,14', ...] replacing one parameter's values
+    grid = {family: dict(SWEEP_GRID[family]) for family in families}
+    for override in overrides:
+        key, _, values = override.partition('=')
+        family, _, param = key.partition('.')
+        if family not in grid or param not in grid[family]:
+            raise ValueError(f"Unknown sweep parameter: {key}")
+        grid[family][param] = [float(value) if '.' in value else int(value) for value in values.split(',')]
+    return grid
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Sweep signal parameters over watchlist history')
+    arg_parser.add_argument('watchlist', help='Watchlist file to sweep')
+    arg_parser.add_argument('--period', default='10y')
+    arg_parser.add_argument('--families', nargs='*', choices=list(SWEEP_GRID), default=list(SWEEP_GRID))
+    arg_parser.add_argument('--param', action='append', default=[], metavar='FAMILY.NAME=V1,V2',
+                            help="Replace one parameter's values, e.g. kdj_cross.n=5,9,14")
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--output', default='sweep_results.csv')
+    args = arg_parser.parse_args()
+
+    parser = WatchlistParser(args.watchlist)
+    tickers = parser.extract_tickers(parser.read_watchlist())
+    summary = sweep_history(tickers, parse_grid(args.families, args.param), period=args.period,
+                            workers=args.workers, fetcher=DataFetcher(cache=OHLCVCache()))
+    summary.to_csv(args.output, index=False)
+    print(f"{len(summary)} parameter sets written to {args.output}")
+    print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import contextlib
+import io
+
+from analyzer import DAILY_PERIOD, StockAnalyzer, evaluate_frames
+from benchmark import SyntheticProvider
+from indicator_state import IndicatorStateStore
+from ohlcv_cache import period_start
+from signals import signal_names
+
+TICKERS = [f'T{i}' for i in range(40)]
+REPLAY_DAYS = 30
+
+
+def test_incremental_matches_panel_over_replay():
+    # Replays the daily run day by day over a rolling DAILY_PERIOD window: the
+    # state advanced one bar at a time has to fire exactly what a fresh panel does
+    provider = SyntheticProvider(bars=800)
+    history = {ticker: provider.history(ticker) for ticker in TICKERS}
+    names = signal_names('1d')
+    analyzer = StockAnalyzer(TICKERS, state_store=IndicatorStateStore(path=None))
+    for day in provider.dates[-REPLAY_DAYS:]:
+        start = period_start(DAILY_PERIOD, now=day)
+        frames = {ticker: frame[(frame.index >= start) & (frame.index <= day)] for ticker, frame in history.items()}
+        with contextlib.redirect_stdout(io.StringIO()):
+            incremental = analyzer.analyze_incremental(frames, names)
+            panel = evaluate_frames(frames, names, report=False)
+        assert incremental == panel, day
+    assert analyzer.state_store.rebuilds == len(TICKERS)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+# Calendar periods matching yfinance's bar boundaries: weeks run Monday to
+# Sunday and quarters follow the calendar year. Bars are labelled with the
+# period start, like the ones yfinance returns for interval='1wk'/'3mo'.
+PERIOD_FREQ = {
+    '1wk': 'W-SUN',
+    '1mo': 'M',
+    '3mo': 'Q-DEC',
+}
+
+
+def resample_ohlcv(daily, interval):
+    # Aggregate daily bars into one bar per calendar period. Only sessions
+    # present in the daily history count, so holidays simply shorten their
+    # period, and the current period is returned as a partial bar.
+    daily = daily.dropna(subset=['Close'])
+    if daily.empty:
+        return daily.copy()
+
+    periods = daily.index.to_period(PERIOD_FREQ[interval])
+    codes = periods.asi8
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)] - 1
+
+    bars = {}
+    for column in daily.columns:
+        values = daily[column].to_numpy(dtype=float)
+        if column == 'Open':
+            bars[column] = values[starts]
+        elif column == 'High':
+            bars[column] = np.fmax.reduceat(values, starts)
+        elif column == 'Low':
+            bars[column] = np.fmin.reduceat(values, starts)
+        elif column == 'Volume':
+            bars[column] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:
+            bars[column] = values[ends]
+
+    index = pd.DatetimeIndex(periods[starts].start_time, name=daily.index.name)
+    return pd.DataFrame(bars, index=index)
+
+
+def build_timeframes(daily, intervals=('1wk', '1mo', '3mo')):
+    return {interval: resample_ohlcv(daily, interval) for interval in intervals}
@@ -0,0 +1,146 @@
+import os
+import re
+import threading
+
+# TradingView symbols that are spelled differently on Yahoo Finance
+SYMBOL_MAP = {
+    'SP:SPX': '^GSPC',
+    'TVC:SPX': '^GSPC',
+    'NASDAQ:NDX': '^NDX',
+    'TVC:NDX': '^NDX',
+    'TVC:DJI': '^DJI',
+    'DJ:DJI': '^DJI',
+    'TVC:RUT': '^RUT',
+    'CBOE:VIX': '^VIX',
+    'TVC:VIX': '^VIX',
+}
+CRYPTO_EXCHANGES = {'BITSTAMP', 'COINBASE', 'BINANCE', 'KRAKEN', 'BITFINEX', 'GEMINI', 'CRYPTO'}
+CRYPTO_QUOTE = re.compile(r'^([A-Z0-9]+?)(USDT|USDC|USD)$')
+SECTION_MARK = '###'
+DEFAULT_SECTION = ''
+
+
+def normalize_symbol(token):
+    # 'NASDAQ:aapl ' -> 'AAPL', 'NYSE:BRK.B' -> 'BRK-B', 'BITSTAMP:BTCUSD' -> 'BTC-USD'; None for blanks
+    token = token.strip().upper()
+    if not token:
+        return None
+    if token in SYMBOL_MAP:
+        return SYMBOL_MAP[token]
+    exchange, _, symbol = token.rpartition(':')
+    symbol = symbol.strip()
+    if exchange in CRYPTO_EXCHANGES:
+        match = CRYPTO_QUOTE.match(symbol)
+        if match:
+            return f"{match.group(1)}-USD"
+    return symbol.replace('.', '-') or None
+
+
+def parse_watchlist(text):
+    # (tickers in first-seen order, {section: tickers}); '###name' starts a section
+    tickers = {}
+    sections = {}
+    section = DEFAULT_SECTION
+    for token in re.split(r'[,\n]', text):
+        token = token.strip()
+        if token.startswith(SECTION_MARK):
+            section = token[len(SECTION_MARK):].strip()
+            continue
+        ticker = normalize_symbol(token)
+        if ticker is None:
+            continue
+        tickers.setdefault(ticker, None)
+        members = sections.setdefault(section, [])
+        if ticker not in members:
+            members.append(ticker)
+    return list(tickers), sections
+
+
+class Watchlist:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.signature = None  # (mtime_ns, size) of the version parsed
+        self.tickers = []
+        self.sections = {}
+
+    def reload(self):
+        # Reparse only when the file changed; True if it did
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            signature = None
+        else:
+            signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        if signature is None:
+            self.tickers, self.sections = [], {}
+        else:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.tickers, self.sections = parse_watchlist(file.read())
+        return True
+
+
+class WatchlistChanges:
+    def __init__(self, added, removed):
+        self.added = added
+        self.removed = removed
+
+    def __bool__(self):
+        return bool(self.added or self.removed)
+
+
+class WatchlistIndex:
+    # Parsed, normalized watchlists keyed by file path. Every lookup checks the
+    # file's mtime and size, so edits are picked up without reparsing unchanged
+    # files. changes() diffs the union of all watchlists against the previous
+    # call, so callers can backfill new tickers and evict removed ones.
+    def __init__(self, paths=(), keep=()):
+        # keep: tickers that count as watched regardless of the files, e.g. the chart benchmark
+        self.lock = threading.Lock()
+        self.watchlists = {}
+        self.keep = list(keep)
+        for path in paths:
+            self._watchlist(path)
+        self.baseline = self.universe()
+
+    def _watchlist(self, path):
+        # Callers hold the lock, except during __init__
+        if path not in self.watchlists:
+            self.watchlists[path] = Watchlist(os.path.splitext(os.path.basename(path))[0], path)
+        watchlist = self.watchlists[path]
+        watchlist.reload()
+        return watchlist
+
+    def tickers(self, path):
+        with self.lock:
+            return list(self._watchlist(path).tickers)
+
+    def sections(self, path):
+        with self.lock:
+            return {section: list(tickers) for section, tickers in self._watchlist(path).sections.items()}
+
+    def universe(self):
+        with self.lock:
+            for watchlist in self.watchlists.values():
+                watchlist.reload()
+            return list(dict.fromkeys(self.keep + [ticker for watchlist in self.watchlists.values()
+                                                   for ticker in watchlist.tickers]))
+
+    def membership(self, ticker):
+        # [(watchlist name, section)] the ticker is listed under
+        self.universe()
+        with self.lock:
+            return [(watchlist.name, section) for watchlist in self.watchlists.values()
+                    for section, tickers in watchlist.sections.items() if ticker in tickers]
+
+    def changes(self):
+        # Tickers added to and removed from the union since the last call
+        universe = self.universe()
+        current, previous = set(universe), set(self.baseline)
+        changes = WatchlistChanges([ticker for ticker in universe if ticker not in previous],
+                                   [ticker for ticker in self.baseline if ticker not in current])
+        self.baseline = universe
+        return changes
@@ -1,3 +1,6 @@
+from watchlist_index import parse_watchlist
+
+
 class WatchlistParser:
     def __init__(self, file_path):
         self.file_path = file_path
@@ -8,7 +11,5 @@ class WatchlistParser:
         return watchlist_text
 
     def extract_tickers(self, watchlist_text):
-        tokens = watchlist_text.split(',')
-        tickers = [token for token in tokens if not token.strip().startswith('###')]
-        tickers_cleaned = [ticker.split(':')[1].strip() if ':' in ticker else ticker.strip() for ticker in tickers]
-        return tickers_cleaned
+        # Normalized and deduplicated; WatchlistIndex also keeps the sections and reloads on change
+        return parse_watchlist(watchlist_text)[0]